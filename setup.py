@@ -13,8 +13,12 @@ setup(
     packages=find_packages(exclude=('tests', 'docs')),
     install_requires=[
         'requests',
-        'cx_Oracle'
+        'cx_Oracle',
         #'xlrd',
-        #'openpyxl'
-    ]
+        'openpyxl'
+    ],
+    extras_require={
+        'fast_json': ['orjson'],
+        'http2': ['httpx[http2]']
+    }
 )
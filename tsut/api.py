@@ -11,7 +11,9 @@ TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONIN
 AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
-import copy
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import io
 import json
 import logging
 import requests
@@ -24,12 +26,42 @@ import shutil
 import smtplib
 import ssl
 
+try:
+    import httpx  # optional, only needed when HTTP/2 is requested.
+except ImportError:
+    httpx = None
+
 from .model import User, Group, UsersAndGroups
-from .util import eprint
+from .util import eprint, json_dumps, json_dumps_bytes, json_loads
 
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 
+# Format for the timestamps used in log and archive file names.
+TIMESTAMP_FORMAT = '%d%b%y_%H-%M-%S-%f'
+
+SMTP_PORT = 587
+
+# Number of threads used to get group privileges.  No more than BaseApiInterface.POOL_MAXSIZE, so each thread can
+# keep its own pooled connection.
+PRIVILEGE_FETCH_WORKERS = 16
+
+# Secure SSL context for sending outcome emails.  It is stateless, so one is shared.
+SSL_CONTEXT = ssl.create_default_context()
+
+# A single change reported by the sync, as written to the CSV change log.
+Change = namedtuple("Change", ["entity", "entity_type", "change_type", "timestamp"])
+
+# Maps the keys in the sync response to the (entity type, change type) they describe.
+CHANGE_KINDS = {
+    'usersAdded': ('User', 'Added'),
+    'usersUpdated': ('User', 'Updated'),
+    'usersDeleted': ('User', 'Deleted'),
+    'groupsAdded': ('Group', 'Added'),
+    'groupsUpdated': ('Group', 'Updated'),
+    'groupsDeleted': ('Group', 'Deleted'),
+}
+
 # -------------------------------------------------------------------------------------------------------------------
 
 def write_outcome_file(file_path='./sync_outcome.txt', outcome_file_config_json=None, msg=None,  successful=None):
@@ -78,8 +110,8 @@ class UGJsonReader:
         :return: A UsersAndGroups container based on the JSON.
         :rtype: UsersAndGroups
         """
-        with open(filename, "r") as json_file:
-            json_list = json.load(json_file)
+        with open(filename, "rb") as json_file:
+            json_list = json_loads(json_file.read())
             return self.parse_json(json_list)
 
     def read_from_string(self, json_string):
@@ -90,7 +122,7 @@ class UGJsonReader:
         :return: A UsersAndGroups container based on the JSON.
         :rtype: UsersAndGroups
         """
-        json_list = json.loads(json_string)
+        json_list = json_loads(json_string)
         return self.parse_json(json_list)
 
     @staticmethod
@@ -103,7 +135,7 @@ class UGJsonReader:
         """
         auag = UsersAndGroups()
         for value in json_list:
-            if str(value["principalTypeEnum"]).endswith("_USER"):
+            if value["principalTypeEnum"].endswith("_USER"):
                 user = User(
                     name=value.get("name", None),
                     display_name=value.get("displayName", None),
@@ -113,12 +145,8 @@ class UGJsonReader:
                     created=value.get("created", None),
                     user_id=value.get("id", None)
                 )
-                # TODO remove after testing.
-                if auag.has_user(user.name):
-                    pass
-                    #logging.warning(f"Duplicate user {user.name} already exists.")
-                else:
-                    auag.add_user(user)
+                # Keep the first user if there are duplicates.
+                auag.add_user(user, duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
             else:
                 group = Group(
                     name=value.get("name", None),
@@ -153,13 +181,68 @@ def api_call(f):
     return wrap
 
 
+class Http2Response:
+    """
+    Wraps an httpx response so that it can be used like a requests response.  Only ok differs; everything else,
+    e.g. status_code, content and text, comes from the httpx response.
+    """
+
+    def __init__(self, response):
+        """
+        :param response: The httpx response to wrap.
+        :type response: httpx.Response
+        """
+        self._response = response
+
+    @property
+    def ok(self):
+        """
+        :return: True if the status code is below 400, the same as requests.
+        :rtype: bool
+        """
+        return not self._response.is_error
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class Http2Session:
+    """
+    Wraps an httpx client so that it can be used like the requests session for the calls the API makes.
+    """
+
+    def __init__(self, client):
+        """
+        :param client: The httpx client to send the calls with.
+        :type client: httpx.Client
+        """
+        self.client = client
+        self.headers = client.headers
+
+    def get(self, url, **kwargs):
+        return Http2Response(self.client.get(url, **kwargs))
+
+    def post(self, url, **kwargs):
+        return Http2Response(self.client.post(url, **kwargs))
+
+    def close(self):
+        self.client.close()
+
+
 class BaseApiInterface:
     """
     Provides basic support for calling the ThoughtSpot APIs, particularly for logging in.
     """
     SERVER_URL = "{tsurl}/callosum/v1"
 
-    def __init__(self, tsurl, username, password, disable_ssl=False):
+    # Connection pool settings.  The pool is shared by all instances, see _get_shared_adapter.
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 20
+    MAX_RETRIES = 3  # retries failed connections; requests that reached the server aren't resent.
+
+    _shared_adapter = None
+
+    def __init__(self, tsurl, username, password, disable_ssl=False, use_http2=False):
         """
         Creates a new sync object and logs into ThoughtSpot
         :param tsurl: Root ThoughtSpot URL, e.g. http://some-company.com/
@@ -169,29 +252,73 @@ class BaseApiInterface:
         :param password: Password for admin login.
         :type password: str
         :param disable_ssl: If true, then disable SSL for calls.
-        password for all users.  This can be significantly faster than individual passwords.
+        :type disable_ssl: bool
+        :param use_http2: If true, use an httpx client with HTTP/2 so that calls share one connection.  Requires
+        httpx[http2] to be installed.
+        :type use_http2: bool
         """
         self.tsurl = tsurl
         self.username = username
         self.password = password
-        self.cookies = None
-        self.session = requests.Session()
+        self.authenticated = False  # the session's cookie jar holds the login cookies.
         self.disable_ssl = disable_ssl
-        if disable_ssl:
-            self.session.verify = False
-        self.session.headers = {"X-Requested-By": "ThoughtSpot"}
+        self.use_http2 = use_http2
+        if use_http2:
+            self.session = self._create_http2_client()
+        else:
+            self.session = requests.Session()
+            # Reuse connections to the server rather than doing a new handshake for each call.
+            adapter = BaseApiInterface._get_shared_adapter()
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+            if disable_ssl:
+                self.session.verify = False
+        # Add to the default headers rather than replacing them so that keep-alive and gzip are still requested.
+        self.session.headers.update({"X-Requested-By": "ThoughtSpot", "Connection": "keep-alive"})
+        self._login_url = self.format_url(SyncUsersAndGroups.LOGIN_URL)
+
+    @staticmethod
+    def _get_shared_adapter():
+        """
+        Returns the adapter that all of the requests sessions use.  Each instance has its own session so that the
+        login cookies aren't shared, but the connections in the adapter's pool are reused across instances,
+        e.g. for the SetGroupPrivilegesAPI created when getting users and groups with privileges.
+        :return: The shared adapter.
+        :rtype: requests.adapters.HTTPAdapter
+        """
+        if BaseApiInterface._shared_adapter is None:
+            BaseApiInterface._shared_adapter = requests.adapters.HTTPAdapter(
+                pool_connections=BaseApiInterface.POOL_CONNECTIONS,
+                pool_maxsize=BaseApiInterface.POOL_MAXSIZE,
+                max_retries=BaseApiInterface.MAX_RETRIES)
+        return BaseApiInterface._shared_adapter
+
+    def _create_http2_client(self):
+        """
+        Creates an httpx client that uses HTTP/2, wrapped so that it is called the same way as a requests session.
+        :return: A new HTTP/2 session.
+        :rtype: Http2Session
+        """
+        if httpx is None:
+            raise ImportError("httpx is required for HTTP/2.  Install it with: pip install httpx[http2]")
+
+        transport = httpx.HTTPTransport(http2=True, verify=not self.disable_ssl,
+                                        limits=httpx.Limits(max_connections=BaseApiInterface.POOL_MAXSIZE),
+                                        retries=BaseApiInterface.MAX_RETRIES)
+        # requests doesn't time out by default and syncs can take a while, so don't set a timeout either.  It does follow
+        # redirects, which httpx doesn't unless asked.
+        return Http2Session(httpx.Client(transport=transport, timeout=None, follow_redirects=True))
 
     def login(self):
         """
-        Log into the ThoughtSpot server.
+        Log into the ThoughtSpot server.  The session stores the login cookies and sends them with later calls.
         """
-        url = self.format_url(SyncUsersAndGroups.LOGIN_URL)
         response = self.session.post(
-            url, data={"username": self.username, "password": self.password}
+            self._login_url, data={"username": self.username, "password": self.password}
         )
 
-        if response.status_code == 204:
-            self.cookies = response.cookies
+        if response.ok:
+            self.authenticated = True
             logging.info(f"Successfully logged in as {self.username}")
         else:
             logging.error(f"Failed to log in as {self.username}")
@@ -206,7 +333,7 @@ class BaseApiInterface:
         :return: True if the session is authenticated.
         :rtype: bool
         """
-        return self.cookies is not None
+        return self.authenticated
 
     def format_url(self, url):
         """
@@ -234,13 +361,20 @@ class SyncUsersAndGroups(BaseApiInterface):
     USER_METADATA_URL = "/tspublic/v1/metadata/listobjectheaders?type=USER&batchsize=-1"
     GROUP_METADATA_URL = "/tspublic/v1/metadata/listobjectheaders?type=USER_GROUP&batchsize=-1"
 
+    # If true, the sync payload is also written to the temp folder for debugging.
+    SYNC_DEBUG_DUMP = False
+
+    # Number of seconds the user and group IDs used for deleting are cached.
+    ID_CACHE_TTL = 30
+
     def __init__(
         self,
         tsurl,
         username,
         password,
         disable_ssl=False,
-        global_password=False
+        global_password=False,
+        use_http2=False
     ):
         """
         Creates a new sync object and logs into ThoughtSpot
@@ -250,14 +384,26 @@ class SyncUsersAndGroups(BaseApiInterface):
         :param disable_ssl: If true, then disable SSL for calls.
         :param global_password: If provided, will be passed to the sync call.  This is used to have a single
         password for all users.  This can be significantly faster than individual passwords.
+        :param use_http2: If true, make the calls over HTTP/2 using httpx.
         """
         super(SyncUsersAndGroups, self).__init__(
             tsurl=tsurl,
             username=username,
             password=password,
             disable_ssl=disable_ssl,
+            use_http2=use_http2,
         )
         self.global_password = global_password
+        self._smtp_server = None  # opened on the first email and reused for the rest of the sync.
+        self._email_batch = False  # true while a sync is running, so send_email leaves the connection open.
+        self._id_cache = {}  # metadata URL name -> (time fetched, {name: id}), see _get_ids.
+
+        # The server doesn't change for an instance, so resolve the endpoint URLs once.
+        self._urls = {
+            name: self.format_url(getattr(SyncUsersAndGroups, name))
+            for name in ("GET_ALL_URL", "SYNC_ALL_URL", "UPDATE_PASSWORD_URL", "DELETE_USERS_URL",
+                         "DELETE_GROUPS_URL", "USER_METADATA_URL", "GROUP_METADATA_URL")
+        }
 
     @api_call
     def get_all_users_and_groups(self, get_group_privileges=False):
@@ -269,25 +415,30 @@ class SyncUsersAndGroups(BaseApiInterface):
         :rtype: UsersAndGroups
         """
 
-        url = self.format_url(SyncUsersAndGroups.GET_ALL_URL)
-        response = self.session.get(url, cookies=self.cookies)
-        if response.status_code == 200:
+        url = self._urls["GET_ALL_URL"]
+        response = self.session.get(url)
+        if response.ok:
             logging.info("Successfully got users and groups.")
             #logging.debug(response.text)
 
-            json_list = json.loads(response.text)
+            json_list = json_loads(response.content)
             reader = UGJsonReader()
             auag = reader.parse_json(json_list=json_list)
-            logging.debug("Got {0} users and {1} groups from TS.".format(auag.number_users(), auag.number_groups()))
+            logging.debug("Got %d users and %d groups from TS.", auag.number_users(), auag.number_groups())
 
             
 
             if get_group_privileges:
                 group_priv_api = SetGroupPrivilegesAPI(tsurl=self.tsurl, username=self.username,
-                                                       password=self.password, disable_ssl=self.disable_ssl)
-                for group in auag.get_groups():
-                    group_privs = group_priv_api.get_privileges_for_group(group_name=group.name)
-                    group.privileges = copy.copy(group_privs)
+                                                       password=self.password, disable_ssl=self.disable_ssl,
+                                                       use_http2=self.use_http2)
+                group_priv_api.login()  # log in once up front so the worker threads don't all try to.
+                # The privilege lookups are one or two round trips per group, so overlap them.
+                with ThreadPoolExecutor(max_workers=PRIVILEGE_FETCH_WORKERS) as executor:
+                    futures = {group: executor.submit(group_priv_api.get_privileges_for_group, group_name=group.name)
+                               for group in auag.get_groups()}
+                    for group, future in futures.items():
+                        group.privileges = future.result()  # a new list is parsed for each call.
 
 
             return auag
@@ -306,13 +457,14 @@ class SyncUsersAndGroups(BaseApiInterface):
         :return: A list of user objects.
         :rtype: list of User
         """
-        url = self.format_url(SyncUsersAndGroups.USER_METADATA_URL)
-        response = self.session.get(url, cookies=self.cookies)
+        url = self._urls["USER_METADATA_URL"]
+        response = self.session.get(url)
         users = []
-        if response.status_code == 200:
+        if response.ok:
             logging.info("Successfully got user metadata.")
-            json_list = json.loads(response.text)
-            logging.debug("metadata for users:  %s" % response.text)
+            json_list = json_loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):  # the metadata can be large, so only decode it if needed.
+                logging.debug("metadata for users:  %s", response.text)
             for value in json_list:
                 user = User(
                     name=value.get("name", None),
@@ -329,11 +481,11 @@ class SyncUsersAndGroups(BaseApiInterface):
         else:
             logging.error("Failed to get user metadata.")
             raise requests.ConnectionError(
-                "Error getting user metadata (%d)" % response.status_code,
+                f"Error getting user metadata ({response.status_code})",
                 response.text,
                 )
 
-    def sync_users_and_groups(self, users_and_groups, apply_changes=False, remove_deleted=False, batch_size=-1, create_groups=False, merge_groups=False, log_dir='logs/', archive_dir='archive/', current_timestamp=dt.datetime.now().strftime('%d%b%y_%H-%M-%S-%f'), sync_files=[], email_config_json=None, outcome_file_config_json=None):
+    def sync_users_and_groups(self, users_and_groups, apply_changes=False, remove_deleted=False, batch_size=-1, create_groups=False, merge_groups=False, log_dir='logs/', archive_dir='archive/', current_timestamp=None, sync_files=[], email_config_json=None, outcome_file_config_json=None):
         """
         Syncs users and groups.
         :param users_and_groups: List of users and groups to sync.
@@ -353,6 +505,9 @@ class SyncUsersAndGroups(BaseApiInterface):
         :returns: The response from the sync.
         """
 
+        if current_timestamp is None:
+            current_timestamp = dt.datetime.now().strftime(TIMESTAMP_FORMAT)
+
         if not apply_changes:
             print("Testing sync.  Changes will not be applied.  Use --apply_changes flag to apply.")
 
@@ -368,31 +523,47 @@ class SyncUsersAndGroups(BaseApiInterface):
         if merge_groups:
             SyncUsersAndGroups.__merge_groups_into_new(existing_ugs, users_and_groups)
 
-        # Sync users in batches
-        if batch_size > 0:
-            all_users = users_and_groups.get_users()
-            while len(all_users) > 0:
-                # get a batch of users to sync.
-                user_batch = all_users[:batch_size]
-                del all_users[:batch_size]
-
-                ug_batch = UsersAndGroups()
-                for user in user_batch:
-                    ug_batch.add_user(users_and_groups.get_user(user.name))
-                    if create_groups:
-                        self.__add_all_user_groups(existing_ugs, ug_batch)
-                        self.__add_all_parent_groups(existing_ugs, ug_batch) # Consider making this a separate command-line arg
-                        for u in ug_batch.get_users():
-                            if not existing_ugs.has_user(user_name = u.name):
-                                existing_ugs.add_user(u, duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
-                        for g in ug_batch.get_groups():
-                            if not existing_ugs.has_group(group_name = g.name):
-                                existing_ugs.add_user(g, duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
-                    else:
-                        for group_name in user.groupNames:  # Add the user's groups as well.
-                            ug_batch.add_group(users_and_groups.get_group(group_name=group_name), duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
-
-                self._sync_users_and_groups(users_and_groups=ug_batch,
+        self._email_batch = True
+        try:
+            # Sync users in batches
+            if batch_size > 0:
+                all_users = users_and_groups.get_users()
+                for batch_start in range(0, len(all_users), batch_size):
+                    # get a batch of users to sync.
+                    user_batch = all_users[batch_start:batch_start + batch_size]
+
+                    ug_batch = UsersAndGroups()
+                    for user in user_batch:
+                        ug_batch.add_user(users_and_groups.get_user(user.name))
+                        if create_groups:
+                            self.__add_all_user_groups(existing_ugs, ug_batch)
+                            self.__add_all_parent_groups(existing_ugs, ug_batch) # Consider making this a separate command-line arg
+                            for u in ug_batch.get_users():
+                                if not existing_ugs.has_user(user_name = u.name):
+                                    existing_ugs.add_user(u, duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
+                            for g in ug_batch.get_groups():
+                                if not existing_ugs.has_group(group_name = g.name):
+                                    existing_ugs.add_user(g, duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
+                        else:
+                            for group_name in user.groupNames:  # Add the user's groups as well.
+                                ug_batch.add_group(users_and_groups.get_group(group_name=group_name), duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
+
+                    self._sync_users_and_groups(users_and_groups=ug_batch,
+                                                apply_changes=apply_changes, 
+                                                remove_deleted=remove_deleted,
+                                                log_dir=log_dir, archive_dir=archive_dir, 
+                                                current_timestamp=current_timestamp, 
+                                                email_config_json=email_config_json, 
+                                                outcome_file_config_json=outcome_file_config_json,
+                                                sync_files=sync_files)
+
+                # Sync groups from users_and_groups (the data to be synced) at once, despite batch mode, since this will probably not cause a time-out
+                groups_to_sync = users_and_groups.get_groups()
+                ug_just_for_groups = UsersAndGroups()
+                for group in groups_to_sync:
+                    ug_just_for_groups.add_group(group)
+                self.__add_all_parent_groups(existing_ugs, ug_just_for_groups) # Consider making this a separate command-line arg
+                self._sync_users_and_groups(users_and_groups=ug_just_for_groups,
                                             apply_changes=apply_changes, 
                                             remove_deleted=remove_deleted,
                                             log_dir=log_dir, archive_dir=archive_dir, 
@@ -401,32 +572,20 @@ class SyncUsersAndGroups(BaseApiInterface):
                                             outcome_file_config_json=outcome_file_config_json,
                                             sync_files=sync_files)
 
-            # Sync groups from users_and_groups (the data to be synced) at once, despite batch mode, since this will probably not cause a time-out
-            groups_to_sync = users_and_groups.get_groups()
-            ug_just_for_groups = UsersAndGroups()
-            for group in groups_to_sync:
-                ug_just_for_groups.add_group(group)
-            self.__add_all_parent_groups(existing_ugs, ug_just_for_groups) # Consider making this a separate command-line arg
-            self._sync_users_and_groups(users_and_groups=ug_just_for_groups,
-                                        apply_changes=apply_changes, 
-                                        remove_deleted=remove_deleted,
-                                        log_dir=log_dir, archive_dir=archive_dir, 
-                                        current_timestamp=current_timestamp, 
-                                        email_config_json=email_config_json, 
-                                        outcome_file_config_json=outcome_file_config_json,
-                                        sync_files=sync_files)
-
-        # Sync all users and groups.
-        else:
-            self._sync_users_and_groups(users_and_groups=users_and_groups,
-                apply_changes=apply_changes,
-                remove_deleted=remove_deleted,
-                log_dir=log_dir,
-                archive_dir=archive_dir,
-                current_timestamp=current_timestamp, 
-                email_config_json=email_config_json, 
-                outcome_file_config_json=outcome_file_config_json,
-                sync_files=sync_files)
+            # Sync all users and groups.
+            else:
+                self._sync_users_and_groups(users_and_groups=users_and_groups,
+                    apply_changes=apply_changes,
+                    remove_deleted=remove_deleted,
+                    log_dir=log_dir,
+                    archive_dir=archive_dir,
+                    current_timestamp=current_timestamp, 
+                    email_config_json=email_config_json, 
+                    outcome_file_config_json=outcome_file_config_json,
+                    sync_files=sync_files)
+        finally:
+            self._email_batch = False
+            self._close_email_server()
 
     @staticmethod
     def __add_all_user_groups(original_ugs, new_ugs):
@@ -441,18 +600,16 @@ class SyncUsersAndGroups(BaseApiInterface):
         :return: Nothing.  New users and groups list is updated.
         :rtype: None
         """
-        new_user_groups = set()
-        for user in new_ugs.get_users():
-            new_user_groups.update(user.groupNames)
+        new_user_groups = set().union(*(user.groupNames for user in new_ugs.get_users()))
 
-        for group_name in new_user_groups:
-            if not new_ugs.get_group(group_name=group_name): # The group isn't in the new list.
-                old_group = original_ugs.get_group(group_name=group_name)
-                if old_group:  # the group is in the old list, so use that one.
-                    new_ugs.add_group(g=old_group)
-                else:
-                    new_ugs.add_group(Group(name=group_name, display_name=group_name,
-                                            description="Implicitly created group."))
+        # Only look at the groups that aren't in the new list.  UsersAndGroups.groups is keyed by group name.
+        for group_name in new_user_groups.difference(new_ugs.groups):
+            old_group = original_ugs.get_group(group_name=group_name)
+            if old_group:  # the group is in the old list, so use that one.
+                new_ugs.add_group(g=old_group)
+            else:
+                new_ugs.add_group(Group(name=group_name, display_name=group_name,
+                                        description="Implicitly created group."))
 
     @staticmethod
     def __add_all_parent_groups(original_ugs, new_ugs):
@@ -471,14 +628,14 @@ class SyncUsersAndGroups(BaseApiInterface):
         for group in new_ugs.get_groups():
             new_group_parent_groups.update(group.groupNames)
 
-        for group_name in new_group_parent_groups:
-            if not new_ugs.get_group(group_name=group_name): # The group isn't in the new list.
-                old_group = original_ugs.get_group(group_name=group_name)
-                if old_group:  # the group is in the old list, so use that one.
-                    new_ugs.add_group(g=old_group)
-                else:
-                    new_ugs.add_group(Group(name=group_name, display_name=group_name,
-                                            description="Implicitly created group."))
+        # Only look at the groups that aren't in the new list.  UsersAndGroups.groups is keyed by group name.
+        for group_name in new_group_parent_groups.difference(new_ugs.groups):
+            old_group = original_ugs.get_group(group_name=group_name)
+            if old_group:  # the group is in the old list, so use that one.
+                new_ugs.add_group(g=old_group)
+            else:
+                new_ugs.add_group(Group(name=group_name, display_name=group_name,
+                                        description="Implicitly created group."))
 
     @staticmethod
     def __merge_groups_into_new(original_ugs, new_ugs):
@@ -498,6 +655,14 @@ class SyncUsersAndGroups(BaseApiInterface):
                 new_user.groupNames.extend(original_user.groupNames)
 
     def send_email(self, email_config_json, successful):
+        """
+        Sends the success or failure email.  During sync_users_and_groups the SMTP connection is kept open so that
+        it can be reused for the other emails (e.g. one per batch).  Otherwise it is closed after sending.
+        :param email_config_json: Path to JSON email config file.
+        :type email_config_json: str
+        :param successful: True if the sync was successful.
+        :type successful: bool
+        """
 
         success_msg = "Subject: Success - Sync with TS\n\nSync with TS was successful."
         failure_msg = "Subject: Failure - Sync with TS\n\nSync with TS failed."
@@ -505,11 +670,8 @@ class SyncUsersAndGroups(BaseApiInterface):
         # read config
         with open(email_config_json) as json_file:
             email_data = json.load(json_file)
-        smtp_server = email_data['smtp_server']
-        port = 587
         sender_email = email_data['sender_email']
         receiver_emails = email_data['receiver_emails']
-        password = email_data['password']
 
         try:
             success_msg = email_data['success_msg']
@@ -519,17 +681,51 @@ class SyncUsersAndGroups(BaseApiInterface):
 
         message = success_msg if successful else failure_msg
 
-        # Create a secure SSL context
-        context = ssl.create_default_context()
-        # Set up email server and credentials for sending outcome alerts.
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.starttls(context=context)
-            server.login(sender_email, password)
-            server.sendmail(sender_email, receiver_emails, message)
+        try:
+            try:
+                self._get_email_server(email_data).sendmail(sender_email, receiver_emails, message)
+            except smtplib.SMTPServerDisconnected:
+                # The server may have dropped an idle connection between batches, so reconnect once.
+                self._close_email_server()
+                self._get_email_server(email_data).sendmail(sender_email, receiver_emails, message)
+        finally:
+            if not self._email_batch:
+                self._close_email_server()
+
+    def _get_email_server(self, email_data):
+        """
+        Returns a logged in SMTP connection, creating it on first use.
+        :param email_data: The parsed email config.
+        :type email_data: dict
+        :return: The SMTP connection.
+        :rtype: smtplib.SMTP
+        """
+        if self._smtp_server is None:
+            # Set up email server and credentials for sending outcome alerts.
+            server = smtplib.SMTP(email_data['smtp_server'], SMTP_PORT)
+            try:
+                server.starttls(context=SSL_CONTEXT)
+                server.login(email_data['sender_email'], email_data['password'])
+            except Exception:
+                server.close()
+                raise
+            self._smtp_server = server
+        return self._smtp_server
+
+    def _close_email_server(self):
+        """
+        Closes the SMTP connection if one was opened.
+        """
+        if self._smtp_server is not None:
+            try:
+                self._smtp_server.quit()
+            except (smtplib.SMTPException, OSError):  # e.g. the server already dropped the connection.
+                self._smtp_server.close()
+            self._smtp_server = None
 
 
     @api_call
-    def _sync_users_and_groups(self, users_and_groups, apply_changes=True, remove_deleted=False, log_dir='logs/', archive_dir='archive/', current_timestamp=dt.datetime.now().strftime('%d%b%y_%H-%M-%S-%f'), sync_files=[], email_config_json=None, outcome_file_config_json=None):
+    def _sync_users_and_groups(self, users_and_groups, apply_changes=True, remove_deleted=False, log_dir='logs/', archive_dir='archive/', current_timestamp=None, sync_files=[], email_config_json=None, outcome_file_config_json=None):
         """
         Syncs users and groups.
         :param users_and_groups: List of users and groups to sync.
@@ -568,23 +764,27 @@ class SyncUsersAndGroups(BaseApiInterface):
             raise Exception("Invalid users and groups")
                 
 
-        url = self.format_url(SyncUsersAndGroups.SYNC_ALL_URL)
+        url = self._urls["SYNC_ALL_URL"]
 
-        logging.debug("Calling %s" % url)
-        logging.debug("Sending {0} users and {1} groups.".format(users_and_groups.number_users(), users_and_groups.number_groups()))
+        logging.debug("Calling %s", url)
+        logging.debug("Sending %d users and %d groups.", users_and_groups.number_users(), users_and_groups.number_groups())
         json_str = users_and_groups.to_json()
         #logging.info("%s" % json_str)
-        json.loads(json_str)  # do a load to see if it breaks due to bad JSON.
 
-        # Get the temp folder from the environment settings, so it will work cross platform.
-        logging.debug("Using temp folder:" + tempfile.gettempdir())
-        tmp_file = tempfile.gettempdir() + "/ug.json.%d" % time.time()
+        json_bytes = json_str.encode("utf-8")
 
-        with open(tmp_file, "w") as out:
-            out.write(json_str)
+        if SyncUsersAndGroups.SYNC_DEBUG_DUMP:
+            # Get the temp folder from the environment settings, so it will work cross platform.
+            tmp_file = tempfile.gettempdir() + "/ug.json.%d" % time.time()
+            logging.debug("Dumping sync payload to %s", tmp_file)
+            with open(tmp_file, "wb") as out:
+                out.write(json_bytes)
+
+        # Upload the payload from memory.  requests will accept any file-like object.
+        principals_file = io.BytesIO(json_bytes)
 
         params = {
-            "principals": (tmp_file, open(tmp_file, "rb"), "text/json"),
+            "principals": ("ug.json", principals_file, "text/json"),
             "applyChanges": json.dumps(apply_changes),
             "removeDeleted": json.dumps(remove_deleted),
         }
@@ -592,32 +792,30 @@ class SyncUsersAndGroups(BaseApiInterface):
         if self.global_password:
             params["password"] = self.global_password
 
-        response = self.session.post(url, files=params, cookies=self.cookies)
+        try:
+            response = self.session.post(url, files=params)
+        finally:
+            principals_file.close()
+
+        if apply_changes:
+            # The sync may have created, recreated or removed users and groups, so the cached IDs are out of date.
+            self.refresh_id_cache()
         
         # A bunch of stuff for logging the result of the request immediately above
 
         now = dt.datetime.now()
-        now_str = str(now)
+        now_str = now.isoformat(" ")  # same as str(now)
 
         # If an existing non-dir file is named log_dir, change log_dir to the working directory.
         # Otherwise, use log_dir, creating it if it doesn't exist
-        try:
-            os.makedirs(log_dir)
-        except FileExistsError:
-            if os.path.isfile(log_dir):
-                logging.warn("There is already a file called '{0}'. Logs will instead be saved to '.' (the current working directory).").format(log_dir)
-                log_dir = '.'
-            else: # There is already a dir with that name, that's great (i.e. do nothing, thereby we use that dir)
-                pass
-                
-
-
-        # Ensure that the dir path ends with exactly one '/'
-        if not log_dir.endswith('/'):
-            log_dir += '/'
+        if os.path.isfile(log_dir):
+            logging.warning("There is already a file called '{0}'. Logs will instead be saved to '.' (the current working directory).".format(log_dir))
+            log_dir = '.'
+        else:
+            os.makedirs(log_dir, exist_ok=True)
 
         # The log files will contain a timestamp
-        current_timestamp = now.strftime('%d%b%y_%H-%M-%S-%f')
+        current_timestamp = now.strftime(TIMESTAMP_FORMAT)
 
         # If the --apply_changes flag was absent, this is all in "test mode" and changes are not really being made.
         # This will be capured in the names of the log files.
@@ -625,18 +823,14 @@ class SyncUsersAndGroups(BaseApiInterface):
             current_timestamp += '_Test_Mode'
 
         # If successful request...
-        if response.status_code == 200:
+        if response.ok:
             logging.info("Successfully synced users and groups.")
-            changes_json_bytes = response.text.encode("utf-8")
+            changes_json_bytes = response.content
             #logging.info(changes_json_bytes)
-            changes_dict_orig = json.loads(changes_json_bytes) # a dict like {'usersUpdated: ['bob','john'], ...} 
-            numbers_of_updates = {}
+            changes_dict_orig = json_loads(changes_json_bytes) # a dict like {'usersUpdated: ['bob','john'], ...} 
             # log number of changes by type
-            for key in changes_dict_orig.keys():
-                value = len(changes_dict_orig[key])
-                numbers_of_updates[key] = value
-            for key in numbers_of_updates.keys():
-                logging.info("{0}: {1}".format(key, numbers_of_updates[key]))
+            numbers_of_updates = {key: len(value) for key, value in changes_dict_orig.items()}
+            logging.info("Sync summary:\n%s", "\n".join(f"{key}: {value}" for key, value in numbers_of_updates.items()))
             # log JSON response, limited to 1000 chars
             limited_json = changes_json_bytes[:1000]
             if limited_json != changes_json_bytes:
@@ -645,49 +839,30 @@ class SyncUsersAndGroups(BaseApiInterface):
 
             # Restructure changes_dict_orig (from JSON specifying changes made) in order to create a CSV log of all changes
 
-            changes_dicts = [] # will be a list of dicts like [{'entity':'bob', 'entity_type':'user', 'change_type':'Added'},...]
-            entity_type = None # Will have 2 possible values: 'User' or 'Group'
-            change_type = None # WIll have 3 possible values: 'Added', 'Updated', or 'Deleted'
-            keys = list(changes_dict_orig.keys())
-            if set(keys) != set(['usersAdded', 'usersUpdated', 'usersDeleted', 'groupsAdded', 'groupsUpdated',
-            'groupsDeleted']):
-                logging.warn("Logging to CSV will fail: JSON response keys are unexpected: {0}".format(keys))
-            for key in keys: 
-                if 'users' in key: # e.g. 'usersAdded' -> True
-                    entity_type = 'User'
-                    change_type = key.replace('users', '') # e.g. 'usersAdded' -> 'Added'
-                elif 'groups' in key:
-                    entity_type = 'Group'
-                    change_type = key.replace('groups', '')
-                else:
-                    entity_type = None
-                    change_type = None
-                for entity in changes_dict_orig[key]:
-                    changes_dicts.append({'entity': entity, 'entity_type': entity_type, 'change_type': change_type,
-                    'timestamp': now_str})
-
-
-        # If an existing non-dir file is named archive_dir, change archive_dir to the working directory.
-        # Otherwise, use archive_dir, creating it if it doesn't exist
-            try:
-                os.makedirs(archive_dir)
-            except FileExistsError:
-                if os.path.isfile(archive_dir):
-                    logging.warn("There is already a non-dir file called '{0}'. Logs will instead be saved to '.' (the current working directory).").format(archive_dir)
-                    archive_dir = './'
-
-            # Ensure that the dir paths end in a single '/'
-            if not archive_dir.endswith('/'):
-                archive_dir += '/'
-
-            #for dir_str in [log_dir, archive_dir]:
-            #    if not dir_str.endswith('/'):
-            #        dir_str += '/'
-
+            unexpected_keys = changes_dict_orig.keys() - CHANGE_KINDS.keys()
+            if unexpected_keys:
+                logging.warning("JSON response keys are unexpected and won't be logged to CSV: {0}".format(sorted(unexpected_keys)))
+            # will be a list like [Change(entity='bob', entity_type='User', change_type='Added', timestamp=...),...]
+            changes = []
+            for key, entities in changes_dict_orig.items():
+                kind = CHANGE_KINDS.get(key)
+                if kind is None:
+                    continue
+                entity_type, change_type = kind
+                changes.extend(Change(entity, entity_type, change_type, now_str) for entity in entities)
+
+
+            # If an existing non-dir file is named archive_dir, change archive_dir to the working directory.
+            # Otherwise, use archive_dir, creating it if it doesn't exist
+            if os.path.isfile(archive_dir):
+                logging.warning("There is already a non-dir file called '{0}'. Archives will instead be saved to '.' (the current working directory).".format(archive_dir))
+                archive_dir = '.'
+            else:
+                os.makedirs(archive_dir, exist_ok=True)
 
-            log_file_name_no_ext = log_dir + 'changes_' + current_timestamp
+            log_file_name_no_ext = os.path.join(log_dir, 'changes_' + current_timestamp)
 
-            changes_occurred = len(changes_dicts) > 0 
+            changes_occurred = len(changes) > 0
 
             extra_file_name_component = '_NO_CHANGE' if not changes_occurred else ''
 
@@ -700,28 +875,28 @@ class SyncUsersAndGroups(BaseApiInterface):
 
             with open(csv_log_file_name, 'w') as changes_file_csv:
                 if changes_occurred:
-                    writer = csv.DictWriter(changes_file_csv, fieldnames=changes_dicts[0].keys())
-                    writer.writeheader()
-                    for change in changes_dicts:
-                        writer.writerow(change)
-                    logging.info("Changes occurred: CSV log saved to {0}".format(csv_log_file_name))
+                    writer = csv.writer(changes_file_csv)
+                    writer.writerow(Change._fields)
+                    writer.writerows(changes)
+                    csv_log_msg = "Changes occurred: CSV log saved to {0}".format(csv_log_file_name)
                 else:
-                    logging.info("No changes: A file showing no changes was created at {0}".format(csv_log_file_name))
+                    csv_log_msg = "No changes: A file showing no changes was created at {0}".format(csv_log_file_name)
                     #changes_file.write("No changes occurred when Python updated TS at %s" % now_str)
 
             # Log original JSON (in case, for instance, something goes wrong with the CSV log)
 
             json_log_file_name = log_file_name_no_ext + '.json'
             
-            with open(json_log_file_name, 'w') as changes_file_json:
-                writer = changes_file_json.write(str(changes_json_bytes))
-            logging.info("Log of JSON response saved to ./{0}".format(json_log_file_name))
+            with open(json_log_file_name, 'wb') as changes_file_json:
+                changes_file_json.write(changes_json_bytes)
+            # Report both log locations in one record.
+            logging.info("%s\nLog of JSON response saved to ./%s", csv_log_msg, json_log_file_name)
 
             if True:#apply_changes:
                 if len(sync_files) > 0: # i.e. If you are syncing an excel or CSV(s)
                     logging.info("Archiving these synced files: {0}".format(str(sync_files)))
                     for f in sync_files:
-                        shutil.copy2(f, archive_dir + f.split("/")[-1]) # tries to preserve metadata during move
+                        shutil.copy2(f, os.path.join(archive_dir, os.path.basename(f))) # tries to preserve metadata during move
                         #shutil.move(sync_file, archive_dir + sync_file)
                 else: # i.e. If you synced to a DB
                     logging.info("Saving the UsersAndGroups you sent to TS as a CSV in {0}".format(log_dir))
@@ -754,12 +929,48 @@ class SyncUsersAndGroups(BaseApiInterface):
                 logging.info("Sent failure email")
 
             logging.error("Failed to sync users and groups.")
-            logging.info(response.text.encode("utf-8"))
-            with open("{0}users_and_groups_failed_sync_{1}.json".format(log_dir, current_timestamp), "w") as outfile:
-                outfile.write(str(json_str.encode("utf-8")))
-            raise requests.ConnectionError("Error syncing users and groups (%d)" % response.status_code)
+            logging.info(response.content)
+            with open(os.path.join(log_dir, "users_and_groups_failed_sync_{0}.json".format(current_timestamp)), "wb") as outfile:
+                outfile.write(json_bytes)
+            raise requests.ConnectionError(f"Error syncing users and groups ({response.status_code})")
 
 
+    def refresh_id_cache(self):
+        """
+        Clears the cached user and group IDs so that the next delete gets them from ThoughtSpot again.
+        """
+        self._id_cache = {}
+
+    def _get_ids(self, metadata_url_name, principal_type):
+        """
+        Returns the IDs for all users or groups by name.  The IDs are cached for ID_CACHE_TTL seconds so that
+        repeated deletes, such as calling delete_user in a loop, don't get all of the metadata each time.
+        :param metadata_url_name: The name of the metadata URL to call, USER_METADATA_URL or GROUP_METADATA_URL.
+        :type metadata_url_name: str
+        :param principal_type: "user" or "group", used for log messages.
+        :type principal_type: str
+        :return: A dictionary of names to IDs.
+        :rtype: dict of str:str
+        """
+        cached = self._id_cache.get(metadata_url_name)
+        if cached and time.time() - cached[0] < SyncUsersAndGroups.ID_CACHE_TTL:
+            return cached[1]
+
+        response = self.session.get(self._urls[metadata_url_name])
+        if not response.ok:
+            logging.error("Failed to get users and groups.")
+            raise requests.ConnectionError(
+                f"Error getting users and groups ({response.status_code})",
+                response.text,
+            )
+
+        logging.info(f"Successfully got {principal_type} metadata.")
+        if logger.isEnabledFor(logging.DEBUG):  # the metadata can be large, so only decode it if needed.
+            logging.debug("response:  %s", response.text)
+        ids = {h["name"]: h["id"] for h in json_loads(response.content)}
+        self._id_cache[metadata_url_name] = (time.time(), ids)
+        return ids
+
     @api_call
     def delete_users(self, usernames):
         """
@@ -768,61 +979,48 @@ class SyncUsersAndGroups(BaseApiInterface):
         :type usernames: list of str
         """
 
-        # for each username, get the guid and put in a list.  Log errors for users not found, but don't stop.
-        logging.info("Deleting users %s." % usernames)
-        url = self.format_url(SyncUsersAndGroups.USER_METADATA_URL)
-        response = self.session.get(url, cookies=self.cookies)
-        users = {}
-        if response.status_code == 200:
-            logging.info("Successfully got user metadata.")
-            logging.debug("response:  %s" % response.text)
-            json_list = json.loads(response.text)
-            for h in json_list:
-                name = h["name"]
-                user_id = h["id"]
-                users[name] = user_id
-
-            user_list = []
-            for u in usernames:
-                group_id = users.get(u, None)
-                if not group_id:
-                    logging.warning("User %s not found, not attempting to delete this user." % u)
-                else:
-                    user_list.append(group_id)
-
-            if not user_list:
-                logging.warning("No valid users to delete.")
-                return
-
-            logging.info("Deleting user IDs %s." % user_list)
-            url = self.format_url(SyncUsersAndGroups.DELETE_USERS_URL)
-            params = {"ids": json.dumps(user_list)}
-            response = self.session.post(
-                url, data=params, cookies=self.cookies
-            )
+        if not usernames:  # don't get all of the metadata when there's nothing to delete.
+            logging.warning("No valid users to delete.")
+            return
 
-            if response.status_code != 204:
-                logging.error("Failed to delete %s" % user_list)
-                raise requests.ConnectionError(
-                    "Error getting users and groups (%d)"
-                    % response.status_code,
-                    response.text,
-                )
+        # for each username, get the guid and put in a list.  Log errors for users not found, but don't stop.
+        logging.info("Deleting users %s.", usernames)
+        users = self._get_ids("USER_METADATA_URL", "user")
+
+        missing = [u for u in usernames if u not in users]
+        if missing:  # one record for all of them rather than one per user.
+            logging.warning("Users not found, not attempting to delete: %s", ", ".join(missing))
+        present = users.keys() & set(usernames)
+        user_list = [users[u] for u in usernames if u in present]
+
+        if not user_list:
+            logging.warning("No valid users to delete.")
+            return
+
+        logging.info("Deleting user IDs %s.", user_list)
+        url = self._urls["DELETE_USERS_URL"]
+        params = {"ids": json_dumps(user_list)}
+        response = self.session.post(
+            url, data=params
+        )
 
-        else:
-            logging.error("Failed to get users and groups.")
+        if not response.ok:
+            logging.error("Failed to delete %s", user_list)
             raise requests.ConnectionError(
-                "Error getting users and groups (%d)" % response.status_code,
+                f"Error deleting users ({response.status_code})",
                 response.text,
             )
 
+        for u in present:  # keep the cache current.
+            del users[u]
+
     def delete_user(self, username):
         """
         Deletes the user with the given username.
         :param username: The name of the user.
         :type username: str
         """
-        self.delete_users([username])  # just call the list method.
+        self.delete_users([username])  # just call the list method.  The user IDs are cached between calls.
 
     @api_call
     def delete_groups(self, groupnames):
@@ -832,62 +1030,71 @@ class SyncUsersAndGroups(BaseApiInterface):
         :type groupnames: list of str
         """
 
-        # for each groupname, get the guid and put in a list.  Log errors for groups not found, but don't stop.
-        url = self.format_url(SyncUsersAndGroups.GROUP_METADATA_URL)
-        response = self.session.get(url, cookies=self.cookies)
-        groups = {}
-        if response.status_code == 200:
-            logging.info("Successfully got group metadata.")
-            json_list = json.loads(response.text)
-            # for h in json_list["headers"]:
-            for h in json_list:
-                name = h["name"]
-                group_id = h["id"]
-                groups[name] = group_id
-
-            group_list = []
-            for u in groupnames:
-                group_id = groups.get(u, None)
-                if not group_id:
-                    eprint(
-                        "WARNING:  group %s not found, not attempting to delete this group."
-                        % u
-                    )
-                else:
-                    group_list.append(group_id)
-
-            if not group_list:
-                eprint("No valid groups to delete.")
-                return
+        if not groupnames:  # don't get all of the metadata when there's nothing to delete.
+            logging.warning("No valid groups to delete.")
+            return
 
-            url = self.format_url(SyncUsersAndGroups.DELETE_GROUPS_URL)
-            params = {"ids": json.dumps(group_list)}
-            response = self.session.post(
-                url, data=params, cookies=self.cookies
-            )
-
-            if response.status_code != 204:
-                logging.error("Failed to delete %s" % group_list)
-                raise requests.ConnectionError(
-                    "Error getting groups and groups (%d)"
-                    % response.status_code,
-                    response.text,
-                )
+        # for each groupname, get the guid and put in a list.  Log errors for groups not found, but don't stop.
+        logging.info("Deleting groups %s.", groupnames)
+        groups = self._get_ids("GROUP_METADATA_URL", "group")
+
+        missing = [g for g in groupnames if g not in groups]
+        if missing:  # one record for all of them rather than one per group.
+            logging.warning("Groups not found, not attempting to delete: %s", ", ".join(missing))
+        present = groups.keys() & set(groupnames)
+        group_list = [groups[g] for g in groupnames if g in present]
+
+        if not group_list:
+            logging.warning("No valid groups to delete.")
+            return
+
+        logging.info("Deleting group IDs %s.", group_list)
+        url = self._urls["DELETE_GROUPS_URL"]
+        params = {"ids": json_dumps(group_list)}
+        response = self.session.post(
+            url, data=params
+        )
 
-        else:
-            logging.error("Failed to get users and groups.")
+        if not response.ok:
+            logging.error("Failed to delete %s", group_list)
             raise requests.ConnectionError(
-                "Error getting users and groups (%d)" % response.status_code,
+                f"Error deleting groups ({response.status_code})",
                 response.text,
             )
 
+        for g in present:  # keep the cache current.
+            del groups[g]
+
     def delete_group(self, groupname):
         """
         Deletes the group with the given groupname.
         :param groupname: The name of the group.
         :type groupname: str
         """
-        self.delete_groups([groupname])  # just call the list method.
+        self.delete_groups([groupname])  # just call the list method.  The group IDs are cached between calls.
+
+    @api_call
+    def delete_users_and_groups(self, usernames, groupnames):
+        """
+        Deletes lists of users and groups.  The user and group metadata needed to find the IDs is downloaded
+        concurrently rather than one after the other.
+        :param usernames: List of the names of the users to delete.
+        :type usernames: list of str
+        :param groupnames: List of the names of the groups to delete.
+        :type groupnames: list of str
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = []
+            if usernames:
+                futures.append(executor.submit(self._get_ids, "USER_METADATA_URL", "user"))
+            if groupnames:
+                futures.append(executor.submit(self._get_ids, "GROUP_METADATA_URL", "group"))
+            for future in futures:
+                future.result()  # raises any error from getting the metadata.
+
+        # The IDs are cached now, so these won't get the metadata again.
+        self.delete_users(usernames)
+        self.delete_groups(groupnames)
 
     @api_call
     def update_user_password(self, userid, currentpassword, password):
@@ -901,22 +1108,21 @@ class SyncUsersAndGroups(BaseApiInterface):
         :type password: str
         """
 
-        url = self.format_url(SyncUsersAndGroups.UPDATE_PASSWORD_URL)
+        url = self._urls["UPDATE_PASSWORD_URL"]
         params = {
             "name": userid,
             "currentpassword": currentpassword,
             "password": password,
         }
 
-        response = self.session.post(url, data=params, cookies=self.cookies)
+        response = self.session.post(url, data=params)
 
-        if response.status_code == 204:
-            logging.info("Successfully updated password for %s." % userid)
+        if response.ok:
+            logging.info("Successfully updated password for %s.", userid)
         else:
-            logging.error("Failed to update password for %s." % userid)
+            logging.error("Failed to update password for %s.", userid)
             raise requests.ConnectionError(
-                "Error (%d) updating user password for %s:  %s"
-                % (response.status_code, userid, response.text)
+                f"Error ({response.status_code}) updating user password for {userid}:  {response.text}"
             )
 
 
@@ -945,21 +1151,32 @@ class SetGroupPrivilegesAPI(BaseApiInterface):
     ADD_PRIVILEGE_URL = "/tspublic/v1/group/addprivilege"
     REMOVE_PRIVILEGE_URL = "/tspublic/v1/group/removeprivilege"
 
-    def __init__(self, tsurl, username, password, disable_ssl=False):
+    def __init__(self, tsurl, username, password, disable_ssl=False, use_http2=False):
         """
         Creates a new sync object and logs into ThoughtSpot
         :param tsurl: Root ThoughtSpot URL, e.g. http://some-company.com/
         :param username: Name of the admin login to use.
         :param password: Password for admin login.
         :param disable_ssl: If true, then disable SSL for calls.
+        :param use_http2: If true, make the calls over HTTP/2 using httpx.
         """
         super(SetGroupPrivilegesAPI, self).__init__(
             tsurl=tsurl,
             username=username,
             password=password,
             disable_ssl=disable_ssl,
+            use_http2=use_http2,
         )
 
+        # The server doesn't change for an instance, so resolve the endpoint URLs once.
+        self._urls = {
+            name: self.format_url(getattr(SetGroupPrivilegesAPI, name))
+            for name in ("METADATA_LIST_URL", "ADD_PRIVILEGE_URL", "REMOVE_PRIVILEGE_URL")
+        }
+        # The detail URL is per group, so keep the parts around the guid and concatenate for each call.
+        detail_prefix, _, self._detail_url_suffix = SetGroupPrivilegesAPI.METADATA_DETAIL_URL.partition("{guid}")
+        self._detail_url_prefix = self.format_url(detail_prefix)
+
     @api_call
     def get_privileges_for_group(self, group_name):
         """
@@ -968,47 +1185,38 @@ class SetGroupPrivilegesAPI(BaseApiInterface):
         :returns: A list of privileges.
         :rtype: list of str
         """
-        url = self.format_url(
-            SetGroupPrivilegesAPI.METADATA_LIST_URL
-        ) + "&pattern=" + group_name
-        response = self.session.get(url, cookies=self.cookies)
-        if response.status_code == 200:  # success
-            results = json.loads(response.text)
-            try:
-                group_id = results[0][
-                    "id"
-                ]  # should always be present, but might want to add try / catch.
-                detail_url = SetGroupPrivilegesAPI.METADATA_DETAIL_URL.format(
-                    guid=group_id
-                )
-                detail_url = self.format_url(detail_url)
-                detail_response = self.session.get(
-                    detail_url, cookies=self.cookies
-                )
-                if detail_response.status_code == 200:  # success
-                    privileges = json.loads(detail_response.text)["privileges"]
-                    return privileges
-
-                else:
-                    logging.error(
-                        "Failed to get privileges for group %s" % group_name
-                    )
-                    raise requests.ConnectionError(
-                        "Error (%d) setting privileges for group %s.  %s"
-                        % (response.status_code, group_name, response.text)
-                    )
-
-            except Exception:
-                logging.error("Error getting group details.")
-                raise
+        url = self._urls["METADATA_LIST_URL"]
+        # requests encodes the pattern, so group names with spaces, & etc. are handled.
+        response = self.session.get(url, params={"pattern": group_name})
+        if not response.ok:
+            logging.error("Failed to get privileges for group %s", group_name)
+            raise requests.ConnectionError(
+                f"Error ({response.status_code}) getting privileges for group {group_name}.  {response.text}"
+            )
 
-        else:
-            logging.error("Failed to get privileges for group %s" % group_name)
+        results = json_loads(response.content)
+        if not results:
+            logging.error("Error getting group details.")
+            raise ValueError(f"No group found with the name {group_name}")
+
+        # The pattern can match more than one group, so prefer the one with the exact name.
+        header = next((h for h in results if h.get("name") == group_name), results[0])
+        group_id = header.get("id")
+        if not group_id:
+            logging.error("Error getting group details.")
+            raise ValueError(f"No id in the metadata for group {group_name}")
+
+        detail_url = self._detail_url_prefix + group_id + self._detail_url_suffix
+        detail_response = self.session.get(detail_url)
+        if not detail_response.ok:
+            logging.error("Failed to get privileges for group %s", group_name)
             raise requests.ConnectionError(
-                "Error (%d) setting privileges for group %s.  %s"
-                % (response.status_code, group_name, response.text)
+                f"Error ({detail_response.status_code}) getting privileges for group {group_name}.  "
+                f"{detail_response.text}"
             )
 
+        return json_loads(detail_response.content)["privileges"]
+
     @api_call
     def add_privilege(self, groups, privilege):
         """
@@ -1019,24 +1227,24 @@ class SetGroupPrivilegesAPI(BaseApiInterface):
         :type privilege: str
         """
 
-        url = self.format_url(SetGroupPrivilegesAPI.ADD_PRIVILEGE_URL)
+        if not groups:
+            return
+
+        url = self._urls["ADD_PRIVILEGE_URL"]
 
-        params = {"privilege": privilege, "groupNames": json.dumps(groups)}
-        response = self.session.post(url, files=params, cookies=self.cookies)
+        params = {"privilege": privilege, "groupNames": json_dumps_bytes(groups)}
+        response = self.session.post(url, files=params)
 
-        if response.status_code == 204:
+        if response.ok:
             logging.info(
-                "Successfully added privilege %s for groups %s."
-                % (privilege, groups)
+                "Successfully added privilege %s for groups %s.", privilege, groups
             )
         else:
             logging.error(
-                "Failed to add privilege %s for groups %s."
-                % (privilege, groups)
+                "Failed to add privilege %s for groups %s.", privilege, groups
             )
             raise requests.ConnectionError(
-                "Error (%d) adding privilege %s for groups %s.  %s"
-                % (response.status_code, privilege, groups, response.text)
+                f"Error ({response.status_code}) adding privilege {privilege} for groups {groups}.  {response.text}"
             )
 
     @api_call
@@ -1049,24 +1257,24 @@ class SetGroupPrivilegesAPI(BaseApiInterface):
         :type privilege: str
         """
 
-        url = self.format_url(SetGroupPrivilegesAPI.REMOVE_PRIVILEGE_URL)
+        if not groups:
+            return
 
-        params = {"privilege": privilege, "groupNames": json.dumps(groups)}
-        response = self.session.post(url, files=params, cookies=self.cookies)
+        url = self._urls["REMOVE_PRIVILEGE_URL"]
 
-        if response.status_code == 204:
+        params = {"privilege": privilege, "groupNames": json_dumps_bytes(groups)}
+        response = self.session.post(url, files=params)
+
+        if response.ok:
             logging.info(
-                "Successfully removed privilege %s for groups %s."
-                % (privilege, groups)
+                "Successfully removed privilege %s for groups %s.", privilege, groups
             )
         else:
             logging.error(
-                "Failed to remove privilege %s for groups %s."
-                % (privilege, groups)
+                "Failed to remove privilege %s for groups %s.", privilege, groups
             )
             raise requests.ConnectionError(
-                "Error (%d) removing privilege %s for groups %s.  %s"
-                % (response.status_code, privilege, groups, response.text)
+                f"Error ({response.status_code}) removing privilege {privilege} for groups {groups}.  {response.text}"
             )
 
 
@@ -1074,21 +1282,25 @@ class TransferOwnershipApi(BaseApiInterface):
 
     TRANSFER_OWNERSHIP_URL = "/tspublic/v1/user/transfer/ownership"
 
-    def __init__(self, tsurl, username, password, disable_ssl=False):
+    def __init__(self, tsurl, username, password, disable_ssl=False, use_http2=False):
         """
         Creates a new sync object and logs into ThoughtSpot
         :param tsurl: Root ThoughtSpot URL, e.g. http://some-company.com/
         :param username: Name of the admin login to use.
         :param password: Password for admin login.
         :param disable_ssl: If true, then disable SSL for calls.
+        :param use_http2: If true, make the calls over HTTP/2 using httpx.
         """
         super(TransferOwnershipApi, self).__init__(
             tsurl=tsurl,
             username=username,
             password=password,
             disable_ssl=disable_ssl,
+            use_http2=use_http2,
         )
 
+        self._transfer_ownership_url = self.format_url(TransferOwnershipApi.TRANSFER_OWNERSHIP_URL)
+
     @api_call
     def transfer_ownership(self, from_username, to_username):
         """
@@ -1099,16 +1311,15 @@ class TransferOwnershipApi(BaseApiInterface):
         :type to_username: str
         """
 
-        url = self.format_url(TransferOwnershipApi.TRANSFER_OWNERSHIP_URL)
-        url = url + "?fromUserName=" + from_username + "&toUserName=" + to_username
-        response = self.session.post(url, cookies=self.cookies)
+        url = self._transfer_ownership_url
+        response = self.session.post(url, params={"fromUserName": from_username, "toUserName": to_username})
 
-        if response.status_code == 204:
+        if response.ok:
             logging.info(
-                "Successfully transferred ownership to %s." % to_username
+                "Successfully transferred ownership to %s.", to_username
             )
         else:
-            logging.error("Failed to transfer ownership to %s." % to_username)
+            logging.error("Failed to transfer ownership to %s.", to_username)
             raise requests.ConnectionError(
                 f"Error ({response.status_code}) transferring  ownership to {to_username}:  {response.text}"
             )
@@ -1,11 +1,10 @@
 import argparse
 from abc import abstractmethod
-import copy
 import logging
 import datetime as dt
 import os
 
-from tsut.api import SyncUsersAndGroups
+from tsut.api import SyncUsersAndGroups, TIMESTAMP_FORMAT
 #from tsut.model import UsersAndGroups
 from tsut.io import UGXLSWriter, UGXLSReader, UGCSVReader, UGOracleReader
 
@@ -41,7 +40,7 @@ This file contains classes for easily creation applications that work with the T
 """
 
 now = dt.datetime.now()
-current_timestamp = now.strftime('%d%b%y_%H-%M-%S-%f')
+current_timestamp = now.strftime(TIMESTAMP_FORMAT)
 
 # Defines the parameters needed for all parsers that will connect to ThoughtSpot.
 def add_cnx_parser_arguments(parser):
@@ -70,7 +69,7 @@ class ArgumentUser:
         if not required_arguments:
             self._required_arguments = []
         else:
-            self._required_arguments = copy.copy(required_arguments)
+            self._required_arguments = list(required_arguments)
 
     @abstractmethod
     def add_parser_arguments(self, parser):
@@ -275,6 +274,7 @@ class TSUGOracleReader(TSUGReader):
         parser.add_argument("--groups_sql", help="Path to SQL file to read query string from, to get groups.")
         parser.add_argument("--log_dir", default='./logs', help="Identifies the location to save logs of changes made.")
         parser.add_argument("--archive_dir", default='./archive', help="Identifies the location to archive the successfully synced files and or query results.")
+        parser.add_argument("--compress_archive", action="store_true", help="Archive the query results as gzipped CSV files.")
 
     def get_users_and_groups(self, args):
         """
@@ -296,24 +296,20 @@ class TSUGOracleReader(TSUGReader):
         if not log_dir:
             log_dir = './logs/'
 
-        try:
-            os.makedirs(log_dir)
-        except FileExistsError:
-            if os.path.isfile(log_dir):
-                logging.warn("There is already a file called '{0}'. Logs will instead be saved to '.' (the current working directory).").format(log_dir)
-                log_dir = './'
-
-        if not log_dir.endswith('/'):
-            log_dir += '/'
-            
-        logging.basicConfig(filename='{0}log_messages_{1}.log'.format(log_dir, current_timestamp), filemode='w') # Initiate root logger with file handler
+        if os.path.isfile(log_dir):
+            logging.warning("There is already a file called '{0}'. Logs will instead be saved to '.' (the current working directory).".format(log_dir))
+            log_dir = '.'
+        else:
+            os.makedirs(log_dir, exist_ok=True)
+
+        logging.basicConfig(filename=os.path.join(log_dir, 'log_messages_{0}.log'.format(current_timestamp)), filemode='w') # Initiate root logger with file handler
         logger = logging.getLogger()
         sh = logging.StreamHandler()
         logger.addHandler(sh) # adds second handler to write to console
         logger.info("Current time: {}".format(str(now)))
         logging.info("Logger configured from Oracle Reader class.")
 
-        reader = UGOracleReader()
+        reader = UGOracleReader(compress_archive=args.compress_archive)
         ugs = reader.read_from_oracle(oracle_u_pw_dsn=args.oracle_u_pw_dsn, oracle_config=args.oracle_config_json, users_sql=args.users_sql, groups_sql=args.groups_sql, archive_dir=args.archive_dir, current_timestamp=current_timestamp)
         return ugs
 
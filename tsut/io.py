@@ -1,16 +1,22 @@
 import ast
-import copy
+import atexit
+from collections import Counter, namedtuple
 import json
 import csv
+import functools
+import gzip
+import hashlib
 import json
 import os
+import queue
 import re
 import logging
-#from openpyxl import Workbook
-#import xlrd  # reading Excel
+import threading
+from openpyxl import Workbook, load_workbook
 import cx_Oracle
 
 from .api import UsersAndGroups, User, Group, eprint, write_outcome_file
+from .util import json_loads
 
 """
 Copyright 2018 ThoughtSpot
@@ -31,11 +37,89 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR TH
 """Classes to read and write users and groups."""
 
 
+def _parse_list(value):
+    """
+    Parses a list of names from a cell, e.g. ["a", "b", ...].  The writers store the lists as JSON, but hand-edited
+    files may use Python's single quotes, so those fall back to being evaluated as a Python literal.
+    :param value: The cell value to parse.
+    :type value: str
+    :return: The parsed list.  Empty if there is no value.
+    :rtype: list
+    """
+    if not value or value == "[]":  # empty lists are common enough to skip the parsing.
+        return []
+    try:
+        return json_loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+
+def _split_list(value):
+    """
+    Splits a list of names separated by |, e.g. a|b.
+    :param value: The cell value to split.
+    :type value: str
+    :return: The names.  Empty if there is no value.
+    :rtype: list
+    """
+    if not value:
+        return []
+    return [name for name in value.split("|") if name]
+
+
+def _join_list(names):
+    """
+    Joins a list of names with |, e.g. a|b.
+    :param names: The names to join.
+    :type names: list of str
+    :return: The joined names.
+    :rtype: str
+    :raises: ValueError if a name contains |, since it would be read back as more than one name.
+    """
+    for name in names:
+        if "|" in name:
+            raise ValueError("Group name '%s' contains '|', so it can't be written in the pipe format.  Use JSON."
+                             % name)
+    return "|".join(names)
+
+
+# Formats for the Groups columns.  JSON lists are the default.  Separating the names with | is quicker to read and write
+# for large files, but the group names can't contain |.
+GROUPS_FORMAT_JSON = "json"
+GROUPS_FORMAT_PIPE = "pipe"
+_GROUPS_PARSERS = {GROUPS_FORMAT_JSON: _parse_list, GROUPS_FORMAT_PIPE: _split_list}
+_GROUPS_ENCODERS = {GROUPS_FORMAT_JSON: json.dumps, GROUPS_FORMAT_PIPE: _join_list}
+
+# Group names read from Oracle that end with this are not assigned to users.
+_FORBIDDEN_SUFFIX = '_'
+
+
+def _check_groups_format(groups_format):
+    """
+    Verifies that the groups format is one that is supported.  Raises a ValueError if not.
+    :param groups_format: The format to check.
+    :type groups_format: str
+    :raises: ValueError
+    """
+    if groups_format not in _GROUPS_PARSERS:
+        raise ValueError("Unknown groups format '%s'.  Use one of %s." % (groups_format, list(_GROUPS_PARSERS)))
+
+
 class UGXLSWriter:
     """
     Writes users and groups to an Excel spreadsheet.
     """
 
+    def __init__(self, groups_format=GROUPS_FORMAT_JSON):
+        """
+        Creates a new UGXLSWriter
+        :param groups_format: How to write the Groups columns, GROUPS_FORMAT_JSON or GROUPS_FORMAT_PIPE.
+        :type groups_format: str
+        """
+        _check_groups_format(groups_format)
+        self.groups_format = groups_format
+        self._encode_groups = _GROUPS_ENCODERS[groups_format]
+
     def write(self, users_and_groups, filename):
         """
         Writes the content to the given file.
@@ -44,10 +128,9 @@ class UGXLSWriter:
         :param filename:  Name of the file to write to.  No extension is expected and one will be added.
         :type filename: str
         """
-        workbook = Workbook()
-        workbook.remove(
-            workbook.active
-        )  # remove the default sheet since we'll be creating the ones we want.
+        # Write-only workbooks stream the rows out rather than keeping a cell object for every value.  They also don't
+        # have a default sheet, so only the ones we create will be in the file.
+        workbook = Workbook(write_only=True)
         self._write_users(workbook, users_and_groups.get_users())
         self._write_groups(workbook, users_and_groups.get_groups())
         if not (filename.endswith("xls") or filename.endswith("xlsx")):
@@ -65,8 +148,7 @@ class UGXLSWriter:
         :return:
         """
         ws = workbook.create_sheet(title="Users")
-        self._write_header(
-            ws,
+        ws.append(
             [
                 "Name",
                 "Password",
@@ -74,17 +156,24 @@ class UGXLSWriter:
                 "Email",
                 "Groups",
                 "Visibility"
-            ],
+            ]
         )
-        cnt = 2  # start after header.
+        # Look the methods up once rather than for every row.
+        append = ws.append
+        dumps_list = self._dumps_list
+        encode_groups = self._encode_groups
+        dumped_lists = {}
         for user in users:
-            ws.cell(column=1, row=cnt, value=user.name)
-            ws.cell(column=2, row=cnt, value=user.password)
-            ws.cell(column=3, row=cnt, value=user.displayName)
-            ws.cell(column=4, row=cnt, value=user.mail)
-            ws.cell(column=5, row=cnt, value=json.dumps(user.groupNames))
-            ws.cell(column=6, row=cnt, value=user.visibility)
-            cnt += 1
+            append(
+                (
+                    user.name,
+                    user.password,
+                    user.displayName,
+                    user.mail,
+                    dumps_list(user.groupNames, dumped_lists, encode_groups),
+                    user.visibility,
+                )
+            )
 
     def _write_groups(self, workbook, groups):
         """
@@ -96,8 +185,7 @@ class UGXLSWriter:
         :return:
         """
         ws = workbook.create_sheet(title="Groups")
-        self._write_header(
-            ws,
+        ws.append(
             [
                 "Name",
                 "Display Name",
@@ -105,28 +193,43 @@ class UGXLSWriter:
                 "Groups",
                 "Visibility",
                 "Privileges",
-            ],
+            ]
         )
-        cnt = 2  # start after header.
+        append = ws.append
+        dumps_list = self._dumps_list
+        encode_groups = self._encode_groups
+        dumped_lists = {}
+        dumped_privileges = {}  # always JSON, so kept apart from the groups lists.
         for group in groups:
-            ws.cell(column=1, row=cnt, value=group.name)
-            ws.cell(column=2, row=cnt, value=group.displayName)
-            ws.cell(column=3, row=cnt, value=group.description)
-            ws.cell(column=4, row=cnt, value=json.dumps(group.groupNames))
-            ws.cell(column=5, row=cnt, value=group.visibility)
-            privileges = group.privileges if group.privileges else []
-            ws.cell(column=6, row=cnt, value=json.dumps(privileges))
-            cnt += 1
+            append(
+                (
+                    group.name,
+                    group.displayName,
+                    group.description,
+                    dumps_list(group.groupNames, dumped_lists, encode_groups),
+                    group.visibility,
+                    dumps_list(group.privileges, dumped_privileges),
+                )
+            )
 
     @staticmethod
-    def _write_header(worksheet, cols):
+    def _dumps_list(values, dumped_lists, encode=json.dumps):
         """
-        Writes the header for the given worksheet in row 1.
-        :param worksheet:  Worksheet to write to.
-        :param cols:  List of columns to write.
+        Returns the list as a string.  Many users and groups have the same groups or privileges, so each distinct list
+        is only encoded once.
+        :param values:  The list to convert.  None is written as an empty list.
+        :type values: list of str
+        :param dumped_lists:  The lists that have already been encoded with the same encoding for the sheet.
+        :type dumped_lists: dict of tuple:str
+        :param encode:  Converts a list to a string.  Defaults to JSON.
+        :return: The encoded list.
+        :rtype: str
         """
-        for ccnt in range(0, len(cols)):
-            worksheet.cell(column=(ccnt + 1), row=1, value=cols[ccnt])
+        key = tuple(values) if values else ()
+        dumped = dumped_lists.get(key)
+        if dumped is None:
+            dumped = dumped_lists[key] = encode(list(key))
+        return dumped
 
 
 class UGXLSReader:
@@ -153,11 +256,17 @@ class UGXLSReader:
         ],
     }
 
-    def __init__(self):
+    def __init__(self, groups_format=GROUPS_FORMAT_JSON):
         """
         Creates a new UGXLSReader
+        :param groups_format: How the Groups columns are written, GROUPS_FORMAT_JSON or GROUPS_FORMAT_PIPE.
+        :type groups_format: str
         """
+        _check_groups_format(groups_format)
+        self.groups_format = groups_format
+        self._parse_groups = _GROUPS_PARSERS[groups_format]
         self.workbook = None
+        self.sheets = {}
         self.indices = {}
         self.users_and_groups = UsersAndGroups()
 
@@ -170,76 +279,81 @@ class UGXLSReader:
         :rtype UsersAndGroups
         so that they can be modified prior to validation.
         """
-        self.workbook = xlrd.open_workbook(filepath)
-        if self._verify_file_format():
-            self._get_column_indices()
-            self._read_users_from_workbook()
-            self._read_groups_from_workbook()
+        # Read-only workbooks parse the rows as they are iterated rather than loading the whole file.
+        self.workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            if self._load_and_validate_headers():
+                self._read_users_from_workbook()
+                self._read_groups_from_workbook()
+        finally:
+            self.workbook.close()  # read-only workbooks keep the file open until closed.
         return self.users_and_groups
 
-    def _verify_file_format(self):
+    @staticmethod
+    def _get_header_row(sheet):
         """
+        Returns the values in the first row of the sheet.
+        :param sheet:  The sheet to get the header from.
+        :return: The column names.
+        :rtype: tuple
+        """
+        return next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+
+    def _load_and_validate_headers(self):
+        """
+        Reads the header of each required sheet once, checking for the required columns and saving the column indices.
         :return: True if the format of the workbook is valid.
         :rtype: bool
         """
         is_valid = True
-        sheet_names = self.workbook.sheet_names()
+        sheet_names = self.workbook.sheetnames
         for required_sheet in UGXLSReader.required_sheets:
             if required_sheet not in sheet_names:
                 eprint("Error:  missing sheet %s!" % required_sheet)
                 is_valid = False
-            else:
-                sheet = self.workbook.sheet_by_name(required_sheet)
-                header_row = sheet.row_values(rowx=0, start_colx=0)
-                for required_column in UGXLSReader.required_columns[
-                    required_sheet
-                ]:
-                    if required_column not in header_row:
-                        eprint(
-                            "Error:  missing column %s in sheet %s!"
-                            % (required_column, required_sheet)
-                        )
-                        is_valid = False
+                continue
+
+            sheet = self.sheets[required_sheet] = self.workbook[required_sheet]  # keep the sheet for reading the rows.
+            header_row = self._get_header_row(sheet)
+            col_indices = {col: ccnt for ccnt, col in enumerate(header_row)}
+            for required_column in UGXLSReader.required_columns[required_sheet]:
+                if required_column not in col_indices:
+                    eprint(
+                        "Error:  missing column %s in sheet %s!"
+                        % (required_column, required_sheet)
+                    )
+                    is_valid = False
+            self.indices[required_sheet] = col_indices
 
         return is_valid
 
-    def _get_column_indices(self):
-        """
-        Reads the sheets to get all of the column indices.  Assumes the format was already checked.
-        """
-        sheet_names = self.workbook.sheet_names()
-        for sheet_name in sheet_names:
-            if sheet_name in self.required_sheets:
-                sheet = self.workbook.sheet_by_name(sheet_name)
-                col_indices = {}
-                ccnt = 0
-                for col in sheet.row_values(rowx=0, start_colx=0):
-                    col_indices[col] = ccnt
-                    ccnt += 1
-                self.indices[sheet_name] = col_indices
-
     def _read_users_from_workbook(self):
         """
         Reads all the users from the workbook.
         """
 
-        table_sheet = self.workbook.sheet_by_name("Users")
+        table_sheet = self.sheets["Users"]
         indices = self.indices["Users"]
-
-        for row_count in range(1, table_sheet.nrows):
-            row = table_sheet.row_values(rowx=row_count, start_colx=0)
-
-            # "Name", "Password", "Display Name", "Email", "Description", "Groups", "Visibility"
-            username = row[indices["Name"]]
-            password = row[indices["Password"]]
-            display_name = row[indices["Display Name"]]
-            email = row[indices["Email"]]
-            groups = []
-            if row[indices["Groups"]]:
-                groups = ast.literal_eval(
-                    row[indices["Groups"]]
-                )  # assumes a valid list format, e.g. ["a", "b", ...]
-            visibility = row[indices["Visibility"]]
+        # "Name", "Password", "Display Name", "Email", "Groups", "Visibility"
+        name_index = indices["Name"]
+        password_index = indices["Password"]
+        display_name_index = indices["Display Name"]
+        email_index = indices["Email"]
+        groups_index = indices["Groups"]
+        visibility_index = indices["Visibility"]
+        parse_groups = self._parse_groups
+        add_user = self.users_and_groups.add_user
+
+        for row in table_sheet.iter_rows(min_row=2, values_only=True):
+            if not any(row):  # read-only sheets can include trailing empty rows.
+                continue
+
+            username = row[name_index]
+            password = row[password_index]
+            display_name = row[display_name_index]
+            email = row[email_index]
+            groups = parse_groups(row[groups_index])
+            visibility = row[visibility_index]
 
             try:
                 user = User(
@@ -251,9 +365,7 @@ class UGXLSReader:
                     visibility=visibility,
                 )
                 # The format should be consistent with only one user per line.
-                self.users_and_groups.add_user(
-                    user, duplicate=UsersAndGroups.RAISE_ERROR_ON_DUPLICATE
-                )
+                add_user(user, duplicate=UsersAndGroups.RAISE_ERROR_ON_DUPLICATE)
             except:
                 eprint(f"Error reading user with name {username}")
 
@@ -262,25 +374,27 @@ class UGXLSReader:
         Reads all the groups from the workbook.
         """
 
-        table_sheet = self.workbook.sheet_by_name("Groups")
+        table_sheet = self.sheets["Groups"]
         indices = self.indices["Groups"]
-
-        for row_count in range(1, table_sheet.nrows):
-            row = table_sheet.row_values(rowx=row_count, start_colx=0)
-
-            # Name", "Display Name", "Description", "Groups", "Visibility"
-            group_name = row[indices["Name"]]
-            display_name = row[indices["Display Name"]]
-            description = row[indices["Description"]]
-            visibility = row[indices["Visibility"]]
-
-            groups = []
-            if row[indices["Groups"]] and row[
-                indices["Groups"]
-            ]:
-                groups = ast.literal_eval(
-                    row[indices["Groups"]]
-                )  # assumes a valid list format, e.g. ["a", "b", ...]
+        # "Name", "Display Name", "Description", "Groups", "Visibility"
+        name_index = indices["Name"]
+        display_name_index = indices["Display Name"]
+        description_index = indices["Description"]
+        groups_index = indices["Groups"]
+        visibility_index = indices["Visibility"]
+        parse_groups = self._parse_groups
+        add_group = self.users_and_groups.add_group
+
+        for row in table_sheet.iter_rows(min_row=2, values_only=True):
+            if not any(row):  # read-only sheets can include trailing empty rows.
+                continue
+
+            group_name = row[name_index]
+            display_name = row[display_name_index]
+            description = row[description_index]
+            visibility = row[visibility_index]
+
+            groups = parse_groups(row[groups_index])
             try:
                 group = Group(
                     name=group_name,
@@ -290,9 +404,7 @@ class UGXLSReader:
                     visibility=visibility,
                 )
                 # The format should be consistent with only one group per line.
-                self.users_and_groups.add_group(
-                    group, duplicate=UsersAndGroups.RAISE_ERROR_ON_DUPLICATE
-                )
+                add_group(group, duplicate=UsersAndGroups.RAISE_ERROR_ON_DUPLICATE)
             except Exception:
                 eprint("Error reading group with name %s" % group_name)
 
@@ -317,11 +429,15 @@ class UGCSVReader:
         "visibility": "Visibility",
         "privileges": "Privileges"
     }
+    READ_BUFFER_SIZE = 1 << 16  # bigger than the default, but small enough not to slow down reading by line.
+    # UTF-8, ignoring the byte order mark Excel puts at the start of CSV files so the first header still matches.
+    ENCODING = "utf-8-sig"
 
     def __init__(self,
                  user_field_mapping=DEFAULT_USER_FIELD_MAPPING,
                  group_field_mapping=DEFAULT_GROUP_FIELD_MAPPING,
-                 delimiter=","):
+                 delimiter=",",
+                 groups_format=GROUPS_FORMAT_JSON):
         """
         Creates a new CSV reader that can read based on the field mapping and delimiter.  While this class can
         cause groups to be created, the primary use is to have groups that will be.......??????????????????
@@ -330,10 +446,15 @@ class UGCSVReader:
         :param group_field_mapping: The mapping of columns to values for groups.
         :type group_field_mapping: dict of str:str
         :param delimiter: The delimiter to use.
+        :param groups_format: How the Groups columns are written, GROUPS_FORMAT_JSON or GROUPS_FORMAT_PIPE.
+        :type groups_format: str
         """
-        self.user_field_mapping = copy.copy(user_field_mapping)
-        self.group_field_mapping = copy.copy(group_field_mapping)
+        self.user_field_mapping = dict(user_field_mapping)
+        self.group_field_mapping = dict(group_field_mapping)
         self.delimiter = delimiter
+        _check_groups_format(groups_format)
+        self.groups_format = groups_format
+        self._parse_groups = _GROUPS_PARSERS[groups_format]
 
         self.validate_fields()
 
@@ -348,6 +469,40 @@ class UGCSVReader:
         if "name" not in self.group_field_mapping.keys():
             raise ValueError("Missing mapping for 'name' for use with groups CSV.")
 
+    @staticmethod
+    def _padded_rows(csv_reader, width):
+        """
+        Yields the rows from the reader, skipping blank lines and padding short rows with None the same way
+        csv.DictReader does.
+        :param csv_reader: The reader to get the rows from.  The header should already have been read.
+        :param width: The number of columns in the header.
+        :type width: int
+        :return: A generator of rows with at least width values.
+        """
+        for row in csv_reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            yield row
+
+    @staticmethod
+    def _column_index(header, column_name):
+        """
+        Returns the position of a column in the header.
+        :param header: The column names from the first row of the file.
+        :type header: list of str
+        :param column_name: The name of the column to find.
+        :type column_name: str
+        :return: The index of the column.
+        :rtype: int
+        :raises: ValueError if there is no such column.
+        """
+        try:
+            return header.index(column_name)
+        except ValueError:
+            raise ValueError("No column called '%s' in CSV" % column_name) from None
+
     def read_from_file(self, user_file, group_file=None):
         """
         Loads users and groups from the files.  If the group_file is not provided, the groups will be created from the
@@ -364,80 +519,153 @@ class UGCSVReader:
 
         # Do minimal check on user CSV file, read, create User.
 
-        # Saving the column name that "name" maps to since I use it again later
+        # Look up the columns once rather than for every row.
         user_name_column_name = self.user_field_mapping["name"]
-
-        column_names = None
-
-        with open(user_file, 'r') as uf:
-            csv_reader = csv.reader(uf)
-            csv_dict_reader = csv.DictReader(uf)
-            firstline = 1
-            for line in csv_dict_reader:
-                #for the first line, check column names
-                if firstline:
-                    column_names = line.keys()
-                    if user_name_column_name not in column_names:
-                        raise ValueError("No column called '%s' in CSV" % user_name_column_name)
+        display_name_column_name = self.user_field_mapping["display_name"]
+        mail_column_name = self.user_field_mapping["mail"]
+        password_column_name = self.user_field_mapping["password"]
+        groups_column_name = self.user_field_mapping["group_names"]
+        visibility_column_name = self.user_field_mapping["visibility"]
+
+        with open(user_file, 'r', buffering=UGCSVReader.READ_BUFFER_SIZE, encoding=UGCSVReader.ENCODING,
+                  newline='') as uf:
+            # Rows are read as lists and indexed by column position rather than building a dict for each row.
+            csv_reader = csv.reader(uf, delimiter=self.delimiter)
+            header = next(csv_reader, [])
+            # check column names
+            column_index = self._column_index
+            name_index = column_index(header, user_name_column_name)
+            display_name_index = column_index(header, display_name_column_name)
+            mail_index = column_index(header, mail_column_name)
+            password_index = column_index(header, password_column_name)
+            groups_index = column_index(header, groups_column_name)
+            visibility_index = column_index(header, visibility_column_name)
+
+            parse_groups = self._parse_groups
+            users = []
+            for row in self._padded_rows(csv_reader, len(header)):
                 # create User object
-
-                #handle blanks in group_names column
-                groups_field_raw = line[self.user_field_mapping["group_names"]]
-                groups_field = "[]" if groups_field_raw == "" else groups_field_raw
-
                 u = User(
-                    name = line[user_name_column_name],
-                    display_name = line[self.user_field_mapping["display_name"]],
-                    mail = line[self.user_field_mapping["mail"]],
-                    password = line[self.user_field_mapping["password"]],
-                    group_names = ast.literal_eval(groups_field),# assumes valid list format, e.g. ["a", "b", ...]
-                    visibility = line[self.user_field_mapping["visibility"]]
+                    name = row[name_index],
+                    display_name = row[display_name_index],
+                    mail = row[mail_index],
+                    password = row[password_index],
+                    group_names = parse_groups(row[groups_index]),
+                    visibility = row[visibility_index]
                     )
-                #add User to UsersAndGroups object
-                uag.add_user(u)
-                firstline = 0
+                users.append(u)
 
+        #add Users to UsersAndGroups object
+        uag.add_users(users)
 
-        # If there, do minimal check on group CSV file, read, create Group.
 
-        # Saving the column name that "name" maps to since I use it again later
-        group_name_column_name = self.group_field_mapping["name"]
-        g_column_names = None
+        # If there, do minimal check on group CSV file, read, create Group.
 
         if group_file is not None:
-            with open(group_file, 'r') as gf:
-                g_csv_reader = csv.reader(gf)
-                firstline = 1
-                g_csv_dict_reader = csv.DictReader(gf)
-                for line in g_csv_dict_reader:
-                    #for the first line, check column names
-                    if firstline:
-                        g_column_names = line.keys()
-                        if group_name_column_name not in g_column_names:
-                            raise ValueError("No column called '%s' in CSV" % group_name_column_name)
-                        
-                    if group_name_column_name not in g_column_names:
-                        raise ValueError("No column called '%s' in CSV" % group_name_column_name)
+            group_name_column_name = self.group_field_mapping["name"]
+            display_name_column_name = self.group_field_mapping["display_name"]
+            description_column_name = self.group_field_mapping["description"]
+            privileges_column_name = self.group_field_mapping["privileges"]
+            groups_column_name = self.group_field_mapping["group_names"]
+            visibility_column_name = self.group_field_mapping["visibility"]
+
+            with open(group_file, 'r', buffering=UGCSVReader.READ_BUFFER_SIZE, encoding=UGCSVReader.ENCODING,
+                      newline='') as gf:
+                g_csv_reader = csv.reader(gf, delimiter=self.delimiter)
+                g_header = next(g_csv_reader, [])
+                # check column names
+                column_index = self._column_index
+                name_index = column_index(g_header, group_name_column_name)
+                display_name_index = column_index(g_header, display_name_column_name)
+                description_index = column_index(g_header, description_column_name)
+                privileges_index = column_index(g_header, privileges_column_name)
+                groups_index = column_index(g_header, groups_column_name)
+                visibility_index = column_index(g_header, visibility_column_name)
+
+                parse_groups = self._parse_groups
+                groups = []
+                for row in self._padded_rows(g_csv_reader, len(g_header)):
                     # create Group object
-
-                    #handle blanks in group_names column
-                    g_groups_field_raw = line[self.group_field_mapping["group_names"]]
-                    g_groups_field = "[]" if g_groups_field_raw == "" else g_groups_field_raw
-
                     g = Group(
-                        name = line[group_name_column_name],
-                        display_name = line[self.group_field_mapping["display_name"]],
-                        description = line[self.group_field_mapping["description"]],
-                        privileges = line[self.group_field_mapping["privileges"]],
-                        group_names = ast.literal_eval(line[self.group_field_mapping["group_names"]]),# assumes valid list format, e.g. ["a", "b", ...]
-                        visibility = line[self.group_field_mapping["visibility"]]
+                        name = row[name_index],
+                        display_name = row[display_name_index],
+                        description = row[description_index],
+                        privileges = _parse_list(row[privileges_index]),  # written as JSON, e.g. ["a", "b", ...]
+                        group_names = parse_groups(row[groups_index]),
+                        visibility = row[visibility_index]
                         )
-                    #add User to UsersAndGroups object
-                    uag.add_group(g)
-                    firstline = 0
+                    groups.append(g)
+
+            #add Groups to UsersAndGroups object
+            uag.add_groups(groups)
         return uag
 
 
+OracleConfig = namedtuple("OracleConfig", ["user", "password", "dsn"])
+
+
+@functools.lru_cache(maxsize=4)
+def _load_oracle_config(path, mtime):
+    """
+    Reads the Oracle connection config file.  The results are cached, so the mtime is part of the key to pick up
+    changes to the file.
+    :param path: Path to the JSON config file.
+    :type path: str
+    :param mtime: Modification time of the file.
+    :type mtime: float
+    :return: The user, password and DSN to connect with.
+    :rtype: OracleConfig
+    """
+    with open(path) as json_file:
+        connect_data = json.load(json_file)
+
+    dsn_dict = connect_data["dsn"]
+    dsn = cx_Oracle.makedsn(host=dsn_dict["host"], port=dsn_dict["port"], service_name=dsn_dict["service_name"])
+    return OracleConfig(user=connect_data["user"], password=connect_data["password"], dsn=dsn)
+
+
+# Session pools by (dsn, user, password hash), so repeated reads don't have to log in to Oracle again.  Only a hash of
+# the password is kept, so a changed password still gets a new pool.
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_session_pool(user, password, dsn):
+    """
+    Gets the session pool for the connection details, creating it the first time.
+    :param user: Oracle user name.
+    :type user: str
+    :param password: Oracle password.
+    :type password: str
+    :param dsn: Oracle DSN or TNS name.
+    :type dsn: str
+    :return: The session pool.
+    :rtype: cx_Oracle.SessionPool
+    """
+    key = (dsn, user, hashlib.sha256(password.encode("utf-8")).hexdigest())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = cx_Oracle.SessionPool(user=user, password=password, dsn=dsn, min=1, max=4, increment=1,
+                                         threaded=True, stmtcachesize=UGOracleReader.STATEMENT_CACHE_SIZE)
+            _POOLS[key] = pool
+    return pool
+
+
+@atexit.register
+def _close_session_pools():
+    """
+    Closes the session pools when the program exits, logging out of Oracle.
+    """
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        try:
+            pool.close(force=True)  # the connections have all been released, but don't wait if one wasn't.
+        except Exception as e:
+            logging.warning("Could not close Oracle session pool: %s", e)
+
 
 class UGOracleReader:
     """
@@ -464,18 +692,38 @@ class UGOracleReader:
         "privileges": "Privileges"
     }
 
+    # Number of rows fetched from Oracle per round trip.
+    FETCH_ARRAYSIZE = 5000
+    # Buffer size for writing the archive files so each row isn't a separate write.
+    ARCHIVE_BUFFER_SIZE = 1 << 20
+    # Number of fetched batches that can wait to be processed, see _fetch_in_background.
+    PREFETCH_BATCHES = 4
+    # Number of parsed statements cx_Oracle keeps for each connection.
+    STATEMENT_CACHE_SIZE = 20
+
     def __init__(self,
                  user_field_mapping=DEFAULT_USER_FIELD_MAPPING,
-                 group_field_mapping=DEFAULT_GROUP_FIELD_MAPPING):
+                 group_field_mapping=DEFAULT_GROUP_FIELD_MAPPING,
+                 groups_format=GROUPS_FORMAT_JSON,
+                 compress_archive=False):
         """
         Creates a new Oracle reader.
         :param user_field_mapping: The mapping of columns to values for users.
         :type user_field_mapping: dict of str:str
         :param group_field_mapping: The mapping of columns to values for groups.
         :type group_field_mapping: dict of str:str
+        :param groups_format: How the groups columns are stored, GROUPS_FORMAT_JSON or GROUPS_FORMAT_PIPE.
+        :type groups_format: str
+        :param compress_archive: If true, the query results are archived as .csv.gz files instead of .csv.
+        :type compress_archive: bool
         """
-        self.user_field_mapping = copy.copy(user_field_mapping)
-        self.group_field_mapping = copy.copy(group_field_mapping)
+        self.user_field_mapping = dict(user_field_mapping)
+        self.group_field_mapping = dict(group_field_mapping)
+        self.compress_archive = compress_archive
+        _check_groups_format(groups_format)
+        self.groups_format = groups_format
+        self._parse_groups = _GROUPS_PARSERS[groups_format]
+        self._sql_cache = {}  # path -> SQL text, so repeated reads don't reopen the files.
 
         self.validate_fields()
 
@@ -490,6 +738,183 @@ class UGOracleReader:
         if "name" not in self.group_field_mapping.keys():
             raise ValueError("Missing mapping for 'name'.")
 
+    def _open_archive(self, archive_dir, name, current_timestamp):
+        """
+        Opens an archive file to write query results to.
+        :param archive_dir: The directory to write to.
+        :type archive_dir: str
+        :param name: The start of the file name, e.g. users_to_sync_from_oracle.
+        :type name: str
+        :param current_timestamp: The timestamp to add to the file name.
+        :type current_timestamp: str
+        :return: The file, opened for writing text.
+        """
+        archive_filename = os.path.join(archive_dir, '{0}{1}.csv'.format(name, current_timestamp))
+        if self.compress_archive:
+            # The fastest compression level still makes CSVs several times smaller, so there's less to write.
+            return gzip.open(archive_filename + '.gz', 'wt', compresslevel=1, newline='', encoding='utf-8')
+        return open(archive_filename, 'w', buffering=UGOracleReader.ARCHIVE_BUFFER_SIZE, newline='', encoding='utf-8')
+
+    def _read_sql(self, sql_path):
+        """
+        Returns the SQL in the file.  The file is only read the first time.
+        :param sql_path: Path to the SQL file.
+        :type sql_path: str
+        :return: The SQL to execute.
+        :rtype: str
+        """
+        sql = self._sql_cache.get(sql_path)
+        if sql is None:
+            with open(sql_path) as sql_f:
+                sql = self._sql_cache[sql_path] = sql_f.read()
+        return sql
+
+    @staticmethod
+    def _output_type_handler(cursor, name, default_type, size, precision, scale):
+        """
+        Has cx_Oracle return CLOBs as strings and integer NUMBERs as ints instead of LOB and Decimal objects, so that
+        the values can be parsed and written to the archive file directly.  Called by cx_Oracle for each column.
+        :param cursor: The cursor the query is running on.
+        :param name: The name of the column.
+        :param default_type: The type cx_Oracle would use for the column.
+        :param size: The size of the column.
+        :param precision: The precision of a NUMBER column.
+        :param scale: The scale of a NUMBER column.
+        :return: The variable to fetch the column into, or None to use the default.
+        """
+        if default_type == cx_Oracle.CLOB:
+            return cursor.var(cx_Oracle.LONG_STRING, arraysize=cursor.arraysize)
+        if default_type == cx_Oracle.NUMBER and scale == 0:
+            return cursor.var(int, arraysize=cursor.arraysize)
+
+    @staticmethod
+    def _fetch_in_background(cursor):
+        """
+        Yields the rows from the query that was executed on the cursor.  The batches are fetched on another thread so
+        that fetching the next batch from Oracle overlaps with processing the current one.  The cursor shouldn't be used
+        for anything else until all of the rows have been read.
+        :param cursor: The cursor that the query was executed on.
+        :return: A generator of the rows.
+        :raises: Any error from fetching the rows.
+        """
+        batches = queue.Queue(maxsize=UGOracleReader.PREFETCH_BATCHES)
+        stopped = threading.Event()  # set if the rows stop being read, e.g. because of an error.
+        done = object()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch():
+            try:
+                rows = cursor.fetchmany()
+                while rows and put(rows):
+                    rows = cursor.fetchmany()
+                put(done)
+            except Exception as e:
+                put(e)
+
+        fetcher = threading.Thread(target=fetch, name="oracle-fetch", daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield from batch
+        finally:
+            stopped.set()
+            fetcher.join()
+
+    @staticmethod
+    def _get_column_index(column_names, field_mapping, field):
+        """
+        Returns the index of the column a field is mapped to.
+        :param column_names: The column names from the query results.
+        :type column_names: list of str
+        :param field_mapping: The mapping of fields to columns.
+        :type field_mapping: dict of str:str
+        :param field: The field to find, e.g. "visibility".
+        :type field: str
+        :return: The index of the column or None if the field isn't mapped or the column isn't in the results.
+        :rtype: int
+        """
+        column_name = field_mapping.get(field)
+        if column_name not in column_names:
+            return None
+        return column_names.index(column_name)
+
+    @staticmethod
+    def _get_required_column_index(column_names, field_mapping, field):
+        """
+        Returns the index of the column a field is mapped to, for fields that must be in the query results.
+        :param column_names: The column names from the query results.
+        :type column_names: list of str
+        :param field_mapping: The mapping of fields to columns.
+        :type field_mapping: dict of str:str
+        :param field: The field to find, e.g. "name".
+        :type field: str
+        :return: The index of the column.
+        :rtype: int
+        :raises: ValueError if the column isn't in the query results.
+        """
+        column_name = field_mapping[field]
+        if column_name not in column_names:
+            raise ValueError("No column called '%s' in query results" % column_name)
+        return column_names.index(column_name)
+
+    def _get_groups_columns(self, column_names, field_mapping):
+        """
+        Returns the groups columns that are in the query results.
+        :param column_names: The column names from the query results.
+        :type column_names: list of str
+        :param field_mapping: The mapping of fields to columns.
+        :type field_mapping: dict of str:str
+        :return: Pairs of the name to use in warnings and the column index.
+        :rtype: list of (str, int)
+        """
+        groups_columns = []
+        for label, field in (("Groups", "group_names"), ("Groups2", "group_names2"), ("Groups3", "group_names3")):
+            index = self._get_column_index(column_names, field_mapping, field)
+            if index is not None:
+                groups_columns.append((label, index))
+        return groups_columns
+
+    def _read_groups(self, tupl, groups_columns, seen_names):
+        """
+        Combines the group names from all of the groups columns in a row.  NULL and invalid values are logged and
+        treated as empty lists.
+        :param tupl: The row from the query results.
+        :type tupl: tuple
+        :param groups_columns: The groups columns from _get_groups_columns.
+        :type groups_columns: list of (str, int)
+        :param seen_names: The names read so far, so that rows share one string per name instead of each keeping a
+        copy.  Updated with any new names.
+        :type seen_names: dict of str:str
+        :return: The group names from all of the columns, in order.
+        :rtype: list of str
+        """
+        all_groups = []
+        share_name = seen_names.setdefault
+        for label, index in groups_columns:
+            value = tupl[index]
+            if not value:
+                logging.warning("\"%s\" is NULL in query results. Treating as \"[]\".", label)
+                continue
+            try:
+                # assumes valid list format, e.g. ["a", "b", ...]
+                all_groups += [share_name(name, name) for name in self._parse_groups(value)]
+            except Exception:
+                logging.warning("\"%s\" column could not be evaluated as a list; using []: %s", label, value)
+        return all_groups
+
     def read_from_oracle(self, oracle_u_pw_dsn, oracle_config, users_sql, groups_sql, archive_dir, current_timestamp):
         """
         Loads users and groups from Oracle.  If the groups_sql is not provided, the groups will be created from the
@@ -505,280 +930,160 @@ class UGOracleReader:
         if not archive_dir:
             archive_dir = './archive/'
 
-        try:
-            os.makedirs(archive_dir)
-        except FileExistsError:
-            if os.path.isfile(archive_dir):
-                logging.warn("There is already a file called '{0}'. Query result CSV archives will instead be saved to '.' (the current working directory).").format(archive_dir)
-                archive_dir = './'
-
         # check archive_dir (for achiving query results)
-        if not archive_dir.endswith('/'):
-            archive_dir += '/'
+        if os.path.isfile(archive_dir):
+            logging.warning("There is already a file called '{0}'. Query result CSV archives will instead be saved to '.' (the current working directory).".format(archive_dir))
+            archive_dir = '.'
+        else:
+            os.makedirs(archive_dir, exist_ok=True)
 
         # initialize UsersAndGroups object to add User and Group objects to
         uag = UsersAndGroups()
+        # group names read so far, shared by the users and groups queries.
+        seen_names = {}
 
         # Read in Oracle connection config file, SQL file(s), run query, do minimal check on result, and create User.
 
-        # Saving the column name that "name" maps to since I use it again later
-        user_name_column_name = self.user_field_mapping["name"]
-
         if oracle_u_pw_dsn:
             oracle_u, oracle_pw, oracle_dsn = oracle_u_pw_dsn.split(',')
             try:
-                connection = cx_Oracle.connect(oracle_u, oracle_pw, oracle_dsn) # If this causes error, try setting $TNS_ADMIN to the dir containing tnsnames.ora
+                # If this causes error, try setting $TNS_ADMIN to the dir containing tnsnames.ora
+                pool = _get_session_pool(oracle_u, oracle_pw, oracle_dsn)
+                connection = pool.acquire()
             except Exception as e:
                 write_outcome_file(msg = "Failure. TS sync failed.\nCould not connect to Oracle DB.", successful=False)
                 logging.info("Wrote failure text file")
                 raise e
         else:
-            with open(oracle_config) as json_file:
-                connect_data = json.load(json_file)
-
-            user = connect_data["user"]
-            password = connect_data["password"]
-            dsn_dict = connect_data["dsn"]
-            host = dsn_dict["host"]
-            port = dsn_dict["port"]
-            service_name = dsn_dict["service_name"]
-            dsn = cx_Oracle.makedsn(host=host, port=port, service_name=service_name)
+            config = _load_oracle_config(oracle_config, os.path.getmtime(oracle_config))
             # Connect
-            connection = cx_Oracle.connect(user=user, password=password, dsn=dsn)
-        # Query
-        cursor = connection.cursor()
-        cursor.execute("SET TRANSACTION READ ONLY")
-
-        if users_sql:
-
-            with open(users_sql) as sql_f:
-                sql = sql_f.read()
-
-            cursor.execute(sql)
-
-            column_names = [col[0] for col in cursor.description]
-            if user_name_column_name not in column_names:
-                raise ValueError("No column called '%s' in query results" % user_name_column_name)
-            query_results = cursor.fetchall() # a list
-
-            # Create Users and also add to archive file
-
-            user_archive_filename = '{0}users_to_sync_from_oracle{1}.csv'.format(archive_dir, current_timestamp)
-
-            with open(user_archive_filename, 'w') as user_archive_file:
-                user_writer = csv.DictWriter(user_archive_file, fieldnames=column_names)
-                user_writer.writeheader()
-
-                for tupl in query_results:
-                    line = {} # TODO maybe change name to line_dict
-                    for i in range(0, len(column_names)):
-                        line.update({column_names[i]: tupl[i]})
-                    user_writer.writerow(line)
-
-                    groups_field = "[]"
-                    groups2_field = "[]"
-                    groups3_field = "[]"
-
-                    if self.group_field_mapping["group_names"] in line.keys():
-                        groups_field_val = line[self.group_field_mapping["group_names"]]
-                        if groups_field_val:
-                            groups_field = groups_field_val
-                        else:
-                            logging.warn("\"Groups\" is NULL in query results. Treating as \"[]\".")
-
-                    if 'group_names2' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["group_names2"] in line.keys():
-                            groups2_field_val = line[self.group_field_mapping["group_names2"]]
-                            if groups2_field_val:
-                                groups2_field = groups2_field_val
-                            else:
-                                logging.warn("\"Groups2\" is NULL in query results. Treating as \"[]\".")
-
-                    if 'group_names3' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["group_names3"] in line.keys():
-                            groups3_field_val = line[self.group_field_mapping["group_names3"]]
-                            if groups3_field_val:
-                                groups3_field = groups3_field_val
-                            else:
-                                logging.warn("\"Groups3\" is NULL in query results. Treating as \"[]\".")
-
-
-                    groups1, groups2, groups3 = [list(),list(),list()]
-
-                    try:
-                        groups1 = ast.literal_eval(groups_field)
-                    except:
-                        logging.warn("\"Groups\" column could not be evaluated as a Python list; using [].")
-                        groups1 = []
-
-                    try:
-                        groups2 = ast.literal_eval(groups2_field)
-                    except:
-                        logging.warn("\"Groups2\" column could not be evaluated as a Python list")
-
-
-                    try:
-                        groups3 = ast.literal_eval(groups3_field)
-                    except:
-                        logging.warn("\"Groups3\" column could not be evaluated as a Python list")
-
-
-                    all_groups_unfiltered = groups1 + groups2 + groups3 # assumes valid list format, e.g. ["a", "b", ...]
-
-
-                    # TODO this is an arbirary rule that I shouldn't hard-code in:
-                    # Filter out group names ending in underscore.
-                    all_groups = [x for x in all_groups_unfiltered if not x.endswith('_')]
-                    diff = list(set(all_groups_unfiltered) - set(all_groups))
-                    if len(diff) > 0:
-                        logging.warn("You tried to assign {0} to group(s) whose name ends in '_', which this code prevents: {1}.".format(line[user_name_column_name],str(diff)))
-
-                    # Note if there are repeats
-                    if len(all_groups) != len(set(all_groups)):
-                        mode = max(set(all_groups), key = all_groups.count)
-                        logging.warn("(Combined) Groups column(s) contains at least 1 repeat (after filtering out bad group names, if any). The main or only offender: {0}. Repeats will be filtered out.".format(mode))
-
-
-                    visibility_field = None
-                    if 'visibility' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["visibility"] in line.keys():
-                            visibility_field_val = line[self.group_field_mapping["visibility"]]
-                            if visibility_field_val:
-                                visibility_field = visibility_field_val
-                            else:
-                                #logging.warn("\"Visibility\" is NULL in query results. Treating as None.")
-                                pass
-                        else:
-                            #logging.warn("\"Visibility\" is absent in query results. Treating as None.")
-                            pass
-
-
-                    u = User(
-                        name = line[user_name_column_name],
-                        display_name = line[self.user_field_mapping["display_name"]],
-                        mail = line[self.user_field_mapping["mail"]],
-                        password = line[self.user_field_mapping["password"]],
-                        group_names = all_groups,
-                        visibility = visibility_field
-                        )
-                    #add User to UsersAndGroups object
-                    uag.add_user(u)
-
-
-        if groups_sql:
-
-            group_name_column_name = self.group_field_mapping["name"]
-
-            with open(groups_sql) as sql_f:
-                sql = sql_f.read()
-
-            cursor.execute(sql)
-
-            column_names = [col[0] for col in cursor.description]
-            if group_name_column_name not in column_names:
-                raise ValueError("No column called '%s' in query results" % group_name_column_name)
-            query_results = cursor.fetchall() # a list
-
-            # Create Users and also add to archive file
-
-            group_archive_filename = '{0}groups_to_sync_from_oracle{1}.csv'.format(archive_dir, current_timestamp)
-
-            with open(group_archive_filename, 'w') as group_archive_file:
-                group_writer = csv.DictWriter(group_archive_file, fieldnames=column_names)
-                group_writer.writeheader()
-
-                for tupl in query_results:
-                    line = {} # TODO maybe change name to line_dict
-                    for i in range(0, len(column_names)):
-                        line.update({column_names[i]: tupl[i]})
-                    group_writer.writerow(line)
-
-                    groups_field = "[]"
-                    groups2_field = "[]"
-                    groups3_field = "[]"
-
-                    if 'group_names' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["group_names"] in line.keys():
-                            groups_field_val = line[self.group_field_mapping["group_names"]]
-                            if groups_field_val:
-                                groups_field = groups_field_val
-                            else:
-                                logging.warn("\"Groups\" is NULL in query results. Treating as \"[]\".")
-
-                    if 'group_names2' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["group_names2"] in line.keys():
-                            groups2_field_val = line[self.group_field_mapping["group_names2"]]
-                            if groups2_field_val:
-                                groups2_field = groups2_field_val
-                            else:
-                                logging.warn("\"Groups2\" is NULL in query results. Treating as \"[]\".")
-
-                    if 'group_names3' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["group_names3"] in line.keys():
-                            groups3_field_val = line[self.group_field_mapping["group_names3"]]
-                            if groups3_field_val:
-                                groups3_field = groups3_field_val
-                            else:
-                                logging.warn("\"Groups3\" is NULL in query results. Treating as \"[]\".")
-
-                    groups1, groups2, groups3 = ['[]','[]','[]']
-
-                    try:
-                        groups1 = ast.literal_eval(groups_field)
-                    except:
-                        groups_field_str = str(groups_field)
-                        logging.warn(f"\"Groups\" column could not be evaluated as a Python list: {groups_field_str}")
-
-                    try:
-                        groups2 = ast.literal_eval(groups2_field)
-                    except:
-                        logging.warn("\"Groups2\" column could not be evaluated as a Python list")
-
-                    try:
-                        groups3 = ast.literal_eval(groups3_field)
-                    except:
-                        logging.warn("\"Groups3\" column could not be evaluated as a Python list")
-
-                    all_groups = groups1 + groups2 + groups3 # assumes valid list format, e.g. ["a", "b", ...]
-
-                    visibility_field = None
-                    if 'visibility' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["visibility"] in line.keys():
-                            visibility_field_val = line[self.group_field_mapping["visibility"]]
-                            if visibility_field_val:
-                                visibility_field = visibility_field_val
-                            else:
-                                #logging.warn("\"Visibility\" is NULL in query results. Treating as None.")
-                                pass
-                        else:
-                            #logging.warn("\"Visibility\" is absent in query results. Treating as None.")
-                            pass
-
-                    privileges_field = None
-                    if 'privileges' in self.group_field_mapping.keys():
-                        if self.group_field_mapping["privileges"] in line.keys():
-                            privileges_field_val = line[self.group_field_mapping["privileges"]]
-                            if privileges_field_val:
-                                privileges_field = privileges_field_val
-                            else:
-                                #logging.warn("\"Privileges\" is NULL in query results. Treating as None.")
-                                pass
-                        else:
-                            #logging.warn("\"Privileges\" is absent in query results. Treating as None.")
-                            pass
-
-                    g = Group(
-                        name = line[group_name_column_name],
-                        display_name = line[self.group_field_mapping["display_name"]],
-                        description = line[self.group_field_mapping["description"]],
-                        group_names = all_groups,# assumes valid list format, e.g. ["a", "b", ...]
-                        visibility = visibility_field,
-                        privileges = privileges_field
-                        )
-                    #add User to UsersAndGroups object
-                    uag.add_group(g)
-
-            cursor.close()
+            pool = _get_session_pool(config.user, config.password, config.dsn)
+            connection = pool.acquire()
+        # The connection goes back to the pool when done, even if the queries fail.
+        try:
+            connection.outputtypehandler = UGOracleReader._output_type_handler
+            # Query.  The cursor is closed when done, even if the queries fail.
+            with connection.cursor() as cursor:
+                cursor.arraysize = UGOracleReader.FETCH_ARRAYSIZE
+                cursor.prefetchrows = UGOracleReader.FETCH_ARRAYSIZE + 1  # the first fetch comes back with the execute.
+                cursor.execute("SET TRANSACTION READ ONLY")
+
+                if users_sql:
+
+                    sql = self._read_sql(users_sql)
+
+                    cursor.execute(sql)
+
+                    column_names = [col[0] for col in cursor.description]
+
+                    # Create Users and also add to archive file
+                    # Find the columns once.  The groups and visibility columns don't have to be in the query results.
+                    column_index = self._get_required_column_index
+                    name_index = column_index(column_names, self.user_field_mapping, "name")
+                    display_name_index = column_index(column_names, self.user_field_mapping, "display_name")
+                    mail_index = column_index(column_names, self.user_field_mapping, "mail")
+                    password_index = column_index(column_names, self.user_field_mapping, "password")
+                    groups_columns = self._get_groups_columns(column_names, self.user_field_mapping)
+                    visibility_index = self._get_column_index(column_names, self.user_field_mapping, "visibility")
+
+                    with self._open_archive(archive_dir, 'users_to_sync_from_oracle', current_timestamp) as user_archive_file:
+                        # The rows are in the same order as the column names, so they can be written as they are.
+                        user_writer = csv.writer(user_archive_file)
+                        user_writer.writerow(column_names)
+
+                        # Look the methods up once rather than for every row.
+                        writerow = user_writer.writerow
+                        read_groups = self._read_groups
+                        users = []
+                        # Rows are fetched in batches on another thread while the earlier ones are processed.
+                        for tupl in self._fetch_in_background(cursor):
+                            writerow(tupl)
+
+                            all_groups_unfiltered = read_groups(tupl, groups_columns, seen_names)
+
+                            # TODO this is an arbirary rule that I shouldn't hard-code in:
+                            # Filter out group names ending in underscore.
+                            all_groups = []
+                            diff = []
+                            for x in all_groups_unfiltered:
+                                (diff if x.endswith(_FORBIDDEN_SUFFIX) else all_groups).append(x)
+                            if diff:
+                                logging.warning("You tried to assign %s to group(s) whose name ends in '%s', which this code prevents: %s.", tupl[name_index], _FORBIDDEN_SUFFIX, list(dict.fromkeys(diff)))
+
+                            # Note if there are repeats, and filter them out keeping the first of each.
+                            unique_groups = list(dict.fromkeys(all_groups))
+                            if len(unique_groups) != len(all_groups):
+                                mode = Counter(all_groups).most_common(1)[0][0]
+                                logging.warning("(Combined) Groups column(s) contains at least 1 repeat (after filtering out bad group names, if any). The main or only offender: %s. Repeats will be filtered out.", mode)
+                                all_groups = unique_groups
+
+                            # "Visibility" is treated as None if it is NULL or absent in the query results.
+                            visibility_field = tupl[visibility_index] if visibility_index is not None else None
+
+                            u = User(
+                                name = tupl[name_index],
+                                display_name = tupl[display_name_index],
+                                mail = tupl[mail_index],
+                                password = tupl[password_index],
+                                group_names = all_groups,
+                                visibility = visibility_field or None
+                                )
+                            users.append(u)
+
+                    #add Users to UsersAndGroups object
+                    uag.add_users(users)
+
+
+                if groups_sql:
+
+                    sql = self._read_sql(groups_sql)
+
+                    cursor.execute(sql)
+
+                    column_names = [col[0] for col in cursor.description]
+
+                    # Create Groups and also add to archive file
+                    # Find the columns once.  The groups, visibility and privileges columns don't have to be in the query results.
+                    column_index = self._get_required_column_index
+                    name_index = column_index(column_names, self.group_field_mapping, "name")
+                    display_name_index = column_index(column_names, self.group_field_mapping, "display_name")
+                    description_index = column_index(column_names, self.group_field_mapping, "description")
+                    groups_columns = self._get_groups_columns(column_names, self.group_field_mapping)
+                    visibility_index = self._get_column_index(column_names, self.group_field_mapping, "visibility")
+                    privileges_index = self._get_column_index(column_names, self.group_field_mapping, "privileges")
+
+                    with self._open_archive(archive_dir, 'groups_to_sync_from_oracle', current_timestamp) as group_archive_file:
+                        # The rows are in the same order as the column names, so they can be written as they are.
+                        group_writer = csv.writer(group_archive_file)
+                        group_writer.writerow(column_names)
+
+                        writerow = group_writer.writerow
+                        read_groups = self._read_groups
+                        groups = []
+                        for tupl in self._fetch_in_background(cursor):
+                            writerow(tupl)
+
+                            all_groups = read_groups(tupl, groups_columns, seen_names)
+
+                            # "Visibility" is treated as None and "Privileges" as [] if they are NULL or absent in the query results.
+                            visibility_field = tupl[visibility_index] if visibility_index is not None else None
+                            privileges_field = tupl[privileges_index] if privileges_index is not None else None
+                            try:
+                                privileges_field = _parse_list(privileges_field)  # a JSON list like the groups columns.
+                            except Exception:
+                                logging.warning("\"Privileges\" column could not be evaluated as a list; using []: %s", privileges_field)
+                                privileges_field = []
+
+                            # Positional to skip matching keywords for every row:
+                            # name, display_name, description, group_names, visibility, privileges
+                            g = Group(tupl[name_index], tupl[display_name_index], tupl[description_index], all_groups,
+                                      visibility_field or None, privileges_field)
+                            groups.append(g)
+
+                    #add Groups to UsersAndGroups object
+                    uag.add_groups(groups)
+        finally:
+            pool.release(connection)
 
         return uag
 
@@ -12,11 +12,9 @@ AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 from collections import OrderedDict, namedtuple
-import copy
-import json
 import csv
 
-from .util import eprint, public_props, obj_to_json
+from .util import eprint, public_props, obj_to_json, json_loads
 
 # -------------------------------------------------------------------------------------------------------------------
 
@@ -30,6 +28,9 @@ class User:
     """
     Represents a user to TS.
     """
+    # There can be a lot of users, so they don't get a __dict__.  In the order the JSON should have them.
+    __slots__ = ("principalTypeEnum", "name", "displayName", "password", "mail", "created", "groupNames",
+                 "visibility", "id")
 
     def __init__(
         self,
@@ -124,6 +125,8 @@ class Group:
     """
     Represents a group to TS.
     """
+    __slots__ = ("principalTypeEnum", "name", "displayName", "description", "visibility", "privileges", "created",
+                 "groupNames")
 
     def __init__(
         self,
@@ -159,7 +162,7 @@ class Group:
         self.displayName = display_name if not None else name
         self.description = description
         self.visibility = visibility
-        self.privileges = copy.copy(privileges) if not None else []
+        self.privileges = privileges[:] if privileges else []
         self.created = created
         self.groupNames = list()
         if group_names:
@@ -259,6 +262,22 @@ class UsersAndGroups:
             else:
                 raise Exception(f"Unknown duplication rule {duplicate}")
 
+    def add_users(self, users, duplicate=RAISE_ERROR_ON_DUPLICATE):
+        """
+        Adds the users to the container, the same as calling add_user for each one.  If none of the users are
+        duplicates, they are all added in one update.
+        :param users: User objects to add to the container.
+        :type users: list of User
+        :param duplicate: Flag to indicate how to handle duplicates.
+        """
+        keyed_users = [(u.name.lower(), u) for u in users]
+        new_names = {name for name, _ in keyed_users}
+        if len(new_names) == len(keyed_users) and self.users.keys().isdisjoint(new_names):
+            self.users.update(keyed_users)
+        else:
+            for _, u in keyed_users:
+                self.add_user(u, duplicate=duplicate)
+
     def has_user(self, user_name):
         """
         Returns true if the user is in the collection.
@@ -325,6 +344,26 @@ class UsersAndGroups:
             else:
                 raise Exception(f"Unknown duplication rule {duplicate}")
 
+    def add_groups(self, groups, duplicate=RAISE_ERROR_ON_DUPLICATE):
+        """
+        Adds the groups to the container, the same as calling add_group for each one.  If none of the groups are
+        duplicates, they are all added in one update.
+        :param groups: Group objects to add to the container.
+        :type groups: list of Group
+        :param duplicate: Flag for what to do if there is a duplicate entry.
+        """
+        groups = list(groups)
+        new_names = {g.name for g in groups}
+        if len(new_names) == len(groups) and self.groups.keys().isdisjoint(new_names):
+            for g in groups:
+                if g.groupNames:
+                    assert(isinstance(g.groupNames, list))
+                    g.groupNames = list(g.groupNames)  # making a copy in case the original is modified.
+            self.groups.update((g.name, g) for g in groups)
+        else:
+            for g in groups:
+                self.add_group(g, duplicate=duplicate)
+
     def has_group(self, group_name):
         """
         Returns true if the group is in the collection.
@@ -400,7 +439,7 @@ class UsersAndGroups:
         :rtype: str
         """
         uag_json = self.to_json()
-        uag_dicts = json.loads(uag_json)
+        uag_dicts = json_loads(uag_json)
 
         if not directory.endswith('/'):
             directory += '/'
@@ -451,7 +490,7 @@ class UsersAndGroups:
         :type json_str: str
         :return: Nothing
         """
-        ug_json = json.loads(json_str)
+        ug_json = json_loads(json_str)
         for obj in ug_json:
             type = obj.get("principalTypeEnum", None)
             if type.endswith("_GROUP"):
@@ -479,7 +518,7 @@ class UsersAndGroups:
         :rtype: (bool, issues)
         """
         issues = []
-        valid = True  # true by default until an issue is found.
+        groups = self.groups  # parent groups exist if they are keys in the group dict.
 
         for user in self.users.values():
             # 5.3+ will require emails, but it's not clear if always.  Leaving this commented out for now.
@@ -487,21 +526,18 @@ class UsersAndGroups:
             #    issue = "user %s doesn't have a required email address." % user.name
             #    print(issue)
             #    issues.append(issue)
-            #    valid = False
 
             for parent_group in user.groupNames:
-                if parent_group not in self.groups:
+                if parent_group not in groups:
                     issue = f"user group {parent_group} for user {user.name} does not exist"
                     print(issue)
                     issues.append(issue)
-                    valid = False
 
-        for group in self.groups.values():
+        for group in groups.values():
             for parent_group in group.groupNames:
-                if parent_group not in self.groups:
+                if parent_group not in groups:
                     issue = f"parent group {parent_group} for group {group.name} does not exist"
                     print(issue)
                     issues.append(issue)
-                    valid = False
 
-        return ValidationResults(result=valid, issues=issues)
+        return ValidationResults(result=not issues, issues=issues)
@@ -62,6 +62,35 @@ class TestAllUsersAndGroups(unittest.TestCase):
         self.assertFalse(auag.has_user("user1"))
         self.assertEqual(auag.number_users(), 0)
 
+    def test_adding_multiple_users(self):
+        """Tests adding a list of users, with and without duplicates."""
+        auag = UsersAndGroups()
+
+        auag.add_users([User("user1"), User("user2")])
+        self.assertEqual(auag.number_users(), 2)
+        self.assertEqual(["user1", "user2"], [u.name for u in auag.get_users()])
+
+        with self.assertRaises(Exception):
+            auag.add_users([User("user3"), User("User1")])
+        self.assertTrue(auag.has_user("user3"))  # added before the duplicate was found.
+
+        auag.add_users([User("user4"), User("user4")], duplicate=UsersAndGroups.IGNORE_ON_DUPLICATE)
+        self.assertEqual(auag.number_users(), 4)
+
+    def test_adding_multiple_groups(self):
+        """Tests adding a list of groups, with and without duplicates."""
+        auag = UsersAndGroups()
+
+        group_names = ["Group1"]
+        auag.add_groups([Group("Group1"), Group("Group2", group_names=group_names)])
+        self.assertEqual(auag.number_groups(), 2)
+        group_names.append("Group3")
+        self.assertEqual(["Group1"], auag.get_group("Group2").groupNames)
+
+        with self.assertRaises(Exception):
+            auag.add_groups([Group("Group3"), Group("Group1")])
+        self.assertEqual(auag.number_groups(), 3)
+
     def test_adding_and_removing_groups(self):
         """Tests adding and removing groups."""
         auag = UsersAndGroups()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import tempfile
+
+from tsut.io import UGCSVReader
+
+"""
+Copyright 2018 ThoughtSpot
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+USER_HEADER = "Name,Display Name,Email,Password,Groups,Visibility"
+GROUP_HEADER = "Name,Display Name,Description,Groups,Visibility,Privileges"
+
+
+class TestUGCSVReader(unittest.TestCase):
+    """Tests reading users and groups from CSV files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_file(self, name, text, encoding="utf-8"):
+        """Writes a test file and returns the path to it."""
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+        return path
+
+    def test_read_users_and_groups(self):
+        """Reads users and groups, including the group privileges."""
+        user_file = self.write_file("users.csv", "\n".join([
+            USER_HEADER,
+            'user1,User 1,user1@company.com,pwd1,"[""Group1""]",DEFAULT',
+            'user2,User 2,user2@company.com,pwd2,"[""Group1"", ""Group2""]",NON_SHARABLE',
+        ]) + "\n")
+        group_file = self.write_file("groups.csv", "\n".join([
+            GROUP_HEADER,
+            'Group1,Group 1,The first group,[],DEFAULT,"[""USERDATAUPLOADING"", ""DATADOWNLOADING""]"',
+            'Group2,Group 2,The second group,"[""Group1""]",DEFAULT,',
+        ]) + "\n")
+
+        uags = UGCSVReader().read_from_file(user_file, group_file)
+
+        self.assertEqual(2, uags.number_users())
+        user = uags.get_user("user2")
+        self.assertEqual("User 2", user.displayName)
+        self.assertEqual("user2@company.com", user.mail)
+        self.assertEqual(["Group1", "Group2"], user.groupNames)
+        self.assertEqual("NON_SHARABLE", user.visibility)
+
+        self.assertEqual(2, uags.number_groups())
+        group = uags.get_group("Group1")
+        self.assertEqual("The first group", group.description)
+        self.assertEqual(["USERDATAUPLOADING", "DATADOWNLOADING"], group.privileges)
+        group = uags.get_group("Group2")
+        self.assertEqual(["Group1"], group.groupNames)
+        self.assertEqual([], group.privileges)
+
+    def test_read_with_bom(self):
+        """The byte order mark Excel adds doesn't stop the first column from being found."""
+        user_file = self.write_file("users.csv", USER_HEADER + "\nuser1,User 1,,,,\n", encoding="utf-8-sig")
+
+        uags = UGCSVReader().read_from_file(user_file)
+        self.assertTrue(uags.has_user("user1"))
+
+    def test_read_short_rows_and_blank_lines(self):
+        """Blank lines are skipped and missing values at the end of a row are treated as empty."""
+        user_file = self.write_file("users.csv", "\n".join([
+            USER_HEADER,
+            "",
+            "user1,User 1",
+            'user2,User 2,user2@company.com,pwd2,"[""Group1""]",DEFAULT',
+            "",
+        ]))
+
+        uags = UGCSVReader().read_from_file(user_file)
+
+        self.assertEqual(2, uags.number_users())
+        user = uags.get_user("user1")
+        self.assertEqual("User 1", user.displayName)
+        self.assertIsNone(user.mail)
+        self.assertEqual([], user.groupNames)
+
+    def test_read_with_delimiter(self):
+        """A delimiter other than a comma is used for both files."""
+        user_file = self.write_file("users.csv", "\n".join([
+            USER_HEADER.replace(",", "|"),
+            'user1|User 1|user1@company.com|pwd1|["Group1", "Group2"]|DEFAULT',
+        ]) + "\n")
+        group_file = self.write_file("groups.csv", "\n".join([
+            GROUP_HEADER.replace(",", "|"),
+            'Group1|Group, 1|First|[]|DEFAULT|["DATADOWNLOADING"]',
+        ]) + "\n")
+
+        uags = UGCSVReader(delimiter="|").read_from_file(user_file, group_file)
+
+        self.assertEqual(["Group1", "Group2"], uags.get_user("user1").groupNames)
+        group = uags.get_group("Group1")
+        self.assertEqual("Group, 1", group.displayName)
+        self.assertEqual(["DATADOWNLOADING"], group.privileges)
+
+    def test_missing_column(self):
+        """Any mapped column that isn't in the file is reported by name."""
+        user_file = self.write_file("users.csv", "Name,Display Name,Password,Groups,Visibility\nuser1,User 1,,,\n")
+
+        with self.assertRaisesRegex(ValueError, "No column called 'Email' in CSV"):
+            UGCSVReader().read_from_file(user_file)
+
+        user_file = self.write_file("users2.csv", USER_HEADER + "\n")
+        group_file = self.write_file("groups.csv", "Name,Display Name,Description,Groups,Visibility\n")
+        with self.assertRaisesRegex(ValueError, "No column called 'Privileges' in CSV"):
+            UGCSVReader().read_from_file(user_file, group_file)
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+import json
+import os
+import smtplib
+import tempfile
+
+from tsut.api import SyncUsersAndGroups
+from tsut.model import UsersAndGroups, User
+
+"""
+Copyright 2018 ThoughtSpot
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+class TestSendEmail(unittest.TestCase):
+    """Tests that the outcome emails open, reuse and close the SMTP connection."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)  # the sync writes an outcome file to the working directory.
+        with open("email.json", "w") as email_file:
+            json.dump({"sender_email": "sync@company.com", "receiver_emails": ["admin@company.com"],
+                       "smtp_server": "smtp.company.com", "password": "pwd"}, email_file)
+
+        self.sync = SyncUsersAndGroups(tsurl="https://tstest", username="tsadmin", password="admin")
+        self.sync.authenticated = True
+
+        patcher = mock.patch("tsut.api.smtplib.SMTP")
+        self.smtp = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def test_send_email_closes_connection(self):
+        """A direct send_email logs in, sends and logs out again."""
+        self.sync.send_email("email.json", successful=True)
+        server = self.smtp.return_value
+        server.login.assert_called_once_with("sync@company.com", "pwd")
+        server.sendmail.assert_called_once()
+        server.quit.assert_called_once()
+        self.assertIsNone(self.sync._smtp_server)
+
+    def test_send_email_reconnects_once(self):
+        """A connection the server dropped is replaced and the email is sent again."""
+        dropped = mock.Mock()
+        dropped.sendmail.side_effect = smtplib.SMTPServerDisconnected()
+        dropped.quit.side_effect = smtplib.SMTPServerDisconnected()
+        fresh = mock.Mock()
+        self.smtp.side_effect = [fresh]
+        self.sync._smtp_server = dropped
+        self.sync._email_batch = True  # as if a sync left the connection open between batches.
+
+        self.sync.send_email("email.json", successful=False)
+        dropped.close.assert_called_once()
+        fresh.sendmail.assert_called_once()
+        self.assertIs(fresh, self.sync._smtp_server)
+
+    def test_sync_reuses_connection(self):
+        """Each batch of a sync sends an email over the same connection, which is closed at the end."""
+        response = mock.Mock(ok=True, content=b'{"usersAdded": []}')
+        self.sync.session = mock.Mock()
+        self.sync.session.post.return_value = response
+
+        uag = UsersAndGroups()
+        uag.add_user(User(name="user1", display_name="User 1"))
+        uag.add_user(User(name="user2", display_name="User 2"))
+        self.sync.sync_users_and_groups(uag, batch_size=1, log_dir="logs/", archive_dir="archive/",
+                                        email_config_json="email.json")
+
+        server = self.smtp.return_value
+        self.assertEqual(1, self.smtp.call_count)
+        self.assertEqual(3, server.sendmail.call_count)  # two user batches and the groups.
+        server.quit.assert_called_once()
+        self.assertIsNone(self.sync._smtp_server)
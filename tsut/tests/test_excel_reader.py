@@ -2,7 +2,7 @@ import unittest
 import os
 
 from tsut.model import UsersAndGroups, User, Group, Visibility
-from tsut.io import UGXLSReader, UGXLSWriter
+from tsut.io import UGXLSReader, UGXLSWriter, GROUPS_FORMAT_PIPE
 
 """
 Copyright 2018 ThoughtSpot
@@ -145,3 +145,31 @@ class TestUGJSONReader(unittest.TestCase):
         self.assertEqual("Test group 3", group.description)
         self.assertEqual(["Group1", "Group2"], group.groupNames)
         self.assertEqual(Visibility.NON_SHAREABLE, group.visibility)
+
+    def test_read_ugs_from_excel_with_pipe_groups(self):
+        """Writes a test file with the groups separated by |, then reads from it."""
+
+        uags_out = UsersAndGroups()
+        uags_out.add_user(User(name="user1", password="pwd1", group_names=["Group1", "Group 2"]))
+        uags_out.add_user(User(name="user2", password="pwd2", group_names=[]))
+        uags_out.add_group(Group(name="Group1", display_name="Group 1", description="Test group 1"))
+        uags_out.add_group(
+            Group(name="Group 2", display_name="Group 2", description="Test group 2", group_names=["Group1"])
+        )
+
+        excel_filename = "test_read_write_pipe.xlsx"
+        UGXLSWriter(groups_format=GROUPS_FORMAT_PIPE).write(uags_out, excel_filename)
+
+        uags_in = UGXLSReader(groups_format=GROUPS_FORMAT_PIPE).read_from_excel(excel_filename)
+        os.remove(excel_filename)
+
+        self.assertEqual(["Group1", "Group 2"], uags_in.get_user("user1").groupNames)
+        self.assertEqual([], uags_in.get_user("user2").groupNames)
+        self.assertEqual([], uags_in.get_group("Group1").groupNames)
+        self.assertEqual(["Group1"], uags_in.get_group("Group 2").groupNames)
+
+        # A name with a | in it would be read back as two groups, so it can't be written.
+        uags_out.add_user(User(name="user3", password="pwd3", group_names=["a|b"]))
+        with self.assertRaisesRegex(ValueError, r"'a\|b'"):
+            UGXLSWriter(groups_format=GROUPS_FORMAT_PIPE).write(uags_out, excel_filename)
+        self.assertFalse(os.path.exists(excel_filename))
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+import json
+
+import requests
+
+from tsut.api import SyncUsersAndGroups, httpx
+
+"""
+Copyright 2018 ThoughtSpot
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestHttp2(unittest.TestCase):
+    """Tests making the API calls with the HTTP/2 client, using a mocked transport instead of a server."""
+
+    def create_sync(self, handler):
+        """
+        Creates a sync object that uses HTTP/2, with the calls answered by handler.
+        """
+        self.requests = []
+
+        def record(request):
+            self.requests.append(request)
+            return handler(request)
+
+        with mock.patch("tsut.api.httpx.HTTPTransport", return_value=httpx.MockTransport(record)):
+            return SyncUsersAndGroups(tsurl="https://tstest", username="tsadmin", password="admin",
+                                      use_http2=True)
+
+    def test_delete_users(self):
+        """Logging in, getting the metadata and deleting all go through the HTTP/2 client."""
+
+        def handler(request):
+            if request.url.path.endswith(SyncUsersAndGroups.LOGIN_URL):
+                return httpx.Response(204)
+            if request.url.path.endswith("/metadata/listobjectheaders"):
+                return httpx.Response(200, json=[{"name": "user1", "id": "id-user1"}])
+            return httpx.Response(204)
+
+        sync = self.create_sync(handler)
+        sync.delete_users(["user1"])
+
+        self.assertTrue(sync.is_authenticated())
+        self.assertEqual(["POST", "GET", "POST"], [r.method for r in self.requests])
+        self.assertEqual("ThoughtSpot", self.requests[1].headers["X-Requested-By"])
+        sent = httpx.QueryParams(self.requests[2].content.decode())  # the form data that was posted.
+        self.assertEqual(json.dumps(["id-user1"]), sent["ids"])
+
+    def test_redirect(self):
+        """Redirects are followed, the same as with requests."""
+
+        def handler(request):
+            if request.url.path.endswith(SyncUsersAndGroups.LOGIN_URL):
+                return httpx.Response(204)
+            if request.url.path.endswith("/metadata/listobjectheaders"):
+                return httpx.Response(302, headers={"Location": "https://tstest/moved/metadata"})
+            if request.url.path == "/moved/metadata":
+                return httpx.Response(200, json=[{"name": "user1", "id": "id-user1"}])
+            return httpx.Response(204)
+
+        sync = self.create_sync(handler)
+        sync.delete_users(["user1"])
+        self.assertEqual(["/moved/metadata"], [r.url.path for r in self.requests if r.url.path.startswith("/moved")])
+        # The delete uses the ID from the redirected call.
+        self.assertEqual(json.dumps(["id-user1"]), httpx.QueryParams(self.requests[-1].content.decode())["ids"])
+
+    def test_ok_matches_requests(self):
+        """Any status below 400 is ok, including ones that aren't followed, e.g. 304."""
+        sync = self.create_sync(lambda request: httpx.Response(304))
+        self.assertTrue(sync.session.get("https://tstest/").ok)
+        sync = self.create_sync(lambda request: httpx.Response(404))
+        self.assertFalse(sync.session.get("https://tstest/").ok)
+
+    def test_failed_call(self):
+        """An error status is reported the same way as with requests."""
+        sync = self.create_sync(lambda request: httpx.Response(401, text="Unauthorized"))
+        with self.assertRaises(requests.ConnectionError):
+            sync.delete_users(["user1"])
+        self.assertFalse(sync.is_authenticated())
@@ -0,0 +1,121 @@
+import unittest
+import json
+import os
+import tempfile
+
+from tsut.api import SyncUsersAndGroups
+from tsut.model import UsersAndGroups, User
+
+"""
+Copyright 2018 ThoughtSpot
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+class FakeResponse:
+    """Just enough of a requests response for the API methods."""
+
+    def __init__(self, content, status_code=200):
+        self.content = content.encode("utf-8")
+        self.text = content
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+
+class FakeSession:
+    """
+    Stands in for the requests session.  The sync adds the users it is sent to the server's users, the same as
+    ThoughtSpot does.
+    """
+
+    def __init__(self, users):
+        self.headers = {}
+        self.users = dict(users)  # name -> id
+        self.metadata_calls = 0
+        self.deleted_ids = []
+
+    def get(self, url):
+        self.metadata_calls += 1
+        return FakeResponse(json.dumps([{"name": name, "id": id} for name, id in self.users.items()]))
+
+    def post(self, url, data=None, files=None):
+        if url.endswith(SyncUsersAndGroups.SYNC_ALL_URL):
+            principals = json.loads(files["principals"][1].read())
+            added = []
+            if files["applyChanges"] == "true":
+                for principal in principals:
+                    if principal["name"] not in self.users:
+                        self.users[principal["name"]] = "id-" + principal["name"]
+                        added.append(principal["name"])
+            return FakeResponse(json.dumps({"usersAdded": added}))
+        if url.endswith(SyncUsersAndGroups.DELETE_USERS_URL) or url.endswith(SyncUsersAndGroups.DELETE_GROUPS_URL):
+            self.deleted_ids.extend(json.loads(data["ids"]))
+            return FakeResponse("")
+        raise AssertionError("Unexpected call to %s" % url)
+
+
+class TestIdCache(unittest.TestCase):
+    """Tests the user and group IDs cached for deleting."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)  # the sync writes an outcome file to the working directory.
+
+        self.sync = SyncUsersAndGroups(tsurl="https://tstest", username="tsadmin", password="admin")
+        self.sync.session = FakeSession({"user1": "id-user1"})
+        self.sync.authenticated = True
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def sync_user(self, name, apply_changes):
+        uag = UsersAndGroups()
+        uag.add_user(User(name=name, display_name=name))
+        self.sync.sync_users_and_groups(uag, apply_changes=apply_changes, log_dir="logs/", archive_dir="archive/")
+
+    def test_deletes_reuse_cached_ids(self):
+        """Deleting one user after another only gets the metadata once."""
+        self.sync.session.users["user2"] = "id-user2"
+        self.sync.delete_user("user1")
+        self.sync.delete_user("user2")
+        self.assertEqual(1, self.sync.session.metadata_calls)
+        self.assertEqual(["id-user1", "id-user2"], self.sync.session.deleted_ids)
+
+    def test_delete_missing_groups(self):
+        """Groups that aren't there are logged in one warning and the rest are still deleted."""
+        self.sync.session.users["Group1"] = "id-Group1"
+        with self.assertLogs(level="WARNING") as logs:
+            self.sync.delete_groups(["Group2", "Group1", "Group3"])
+        self.assertEqual(["WARNING:root:Groups not found, not attempting to delete: Group2, Group3"], logs.output)
+        self.assertEqual(["id-Group1"], self.sync.session.deleted_ids)
+
+    def test_delete_after_sync_sees_new_user(self):
+        """A user created by a sync can be deleted straight away, inside the cache TTL."""
+        self.sync.delete_user("user2")  # not there yet, but the IDs are now cached.
+        self.assertEqual([], self.sync.session.deleted_ids)
+
+        self.sync_user("user2", apply_changes=True)
+        self.sync.delete_user("user2")
+        self.assertEqual(["id-user2"], self.sync.session.deleted_ids)
+
+    def test_test_mode_sync_keeps_cache(self):
+        """A sync that doesn't apply changes leaves the cached IDs alone."""
+        self.sync.delete_user("user2")
+        self.sync_user("user2", apply_changes=False)
+        self.sync.delete_user("user1")
+        self.assertEqual(1, self.sync.session.metadata_calls)
+        self.assertEqual(["id-user1"], self.sync.session.deleted_ids)
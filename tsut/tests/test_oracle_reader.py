@@ -0,0 +1,214 @@
+import unittest
+from unittest import mock
+import csv
+import gzip
+import os
+import tempfile
+import types
+
+import tsut.io
+from tsut.io import UGOracleReader
+
+"""
+Copyright 2018 ThoughtSpot
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+USER_COLUMNS = ["Name", "Display Name", "Email", "Password", "Groups", "Groups2", "Visibility"]
+USER_ROWS = [
+    ("user1", "User 1", "user1@company.com", "pwd1", '["Group1", "bad_"]', "['Group2', 'Group1']", "DEFAULT"),
+    ("user2", "User 2", None, None, None, "not a list", None),
+    ("user3", "User 3", "user3@company.com", "pwd3", '["Group2"]', None, "NON_SHARABLE"),
+]
+GROUP_COLUMNS = ["Name", "Display Name", "Description", "Groups", "Privileges"]
+GROUP_ROWS = [
+    ("Group1", "Group 1", "The first group", "[]", '["DATADOWNLOADING"]'),
+    ("Group2", "Group 2", "The second group", '["Group1"]', None),
+]
+RESULTS = {
+    "users query": (USER_COLUMNS, USER_ROWS),
+    "groups query": (GROUP_COLUMNS, GROUP_ROWS),
+}
+
+
+class FakeCursor:
+    """Returns the RESULTS for each query, a couple of rows per fetch so that there are several batches."""
+
+    def __init__(self, fail_fetch=False):
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.description = None
+        self.rows = []
+        self.fail_fetch = fail_fetch
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def execute(self, sql):
+        columns, self.rows = RESULTS.get(sql.strip(), ([], []))
+        self.description = [(name,) for name in columns]
+
+    def fetchmany(self):
+        if self.fail_fetch:
+            raise RuntimeError("lost the connection")
+        rows, self.rows = self.rows[:2], self.rows[2:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, fail_fetch=False):
+        self.outputtypehandler = None
+        self.cursors = []
+        self.fail_fetch = fail_fetch
+
+    def cursor(self):
+        self.cursors.append(FakeCursor(self.fail_fetch))
+        return self.cursors[-1]
+
+
+class FakeSessionPool:
+    """Hands out FakeConnections and keeps track of how many are in use."""
+
+    created = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.acquired = 0
+        self.released = 0
+        self.closed = False
+        self.fail_fetch = False
+        FakeSessionPool.created.append(self)
+
+    def acquire(self):
+        self.acquired += 1
+        return FakeConnection(self.fail_fetch)
+
+    def release(self, connection):
+        self.released += 1
+
+    def close(self, force=False):
+        self.closed = True
+
+
+class TestUGOracleReader(unittest.TestCase):
+    """Tests reading users and groups from Oracle, using a fake cx_Oracle instead of a database."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.users_sql = self.write_file("users.sql", "users query")
+        self.groups_sql = self.write_file("groups.sql", "groups query")
+        self.archive_dir = os.path.join(self.tmp_dir.name, "archive")
+
+        fake_cx_oracle = types.SimpleNamespace(SessionPool=FakeSessionPool, CLOB=object(), LONG_STRING=object(),
+                                               NUMBER=object())
+        FakeSessionPool.created = []
+        for patcher in (mock.patch.object(tsut.io, "cx_Oracle", fake_cx_oracle),
+                        mock.patch.dict(tsut.io._POOLS, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def read(self, reader, groups_sql=None):
+        return reader.read_from_oracle("tsuser,tspwd,tsdb", None, self.users_sql, groups_sql, self.archive_dir, "_1")
+
+    def test_read_users_and_groups(self):
+        """Reads the users and groups and archives the query results."""
+        uags = self.read(UGOracleReader(), self.groups_sql)
+
+        self.assertEqual(3, uags.number_users())
+        user = uags.get_user("user1")
+        # Names ending in _ and repeats are left out.
+        self.assertEqual(["Group1", "Group2"], user.groupNames)
+        self.assertEqual("DEFAULT", user.visibility)
+        user = uags.get_user("user2")
+        self.assertEqual([], user.groupNames)  # NULL and invalid columns are treated as empty.
+        self.assertIsNone(user.visibility)
+        self.assertEqual(["Group2"], uags.get_user("user3").groupNames)
+
+        self.assertEqual(2, uags.number_groups())
+        self.assertEqual(["DATADOWNLOADING"], uags.get_group("Group1").privileges)
+        group = uags.get_group("Group2")
+        self.assertEqual(["Group1"], group.groupNames)
+        self.assertEqual([], group.privileges)
+
+        with open(os.path.join(self.archive_dir, "users_to_sync_from_oracle_1.csv"), newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(USER_COLUMNS, rows[0])
+        self.assertEqual(["user2", "User 2", "", "", "", "not a list", ""], rows[2])
+        self.assertEqual(len(USER_ROWS) + 1, len(rows))
+        self.assertTrue(os.path.exists(os.path.join(self.archive_dir, "groups_to_sync_from_oracle_1.csv")))
+
+    def test_compressed_archive(self):
+        """The archive can be written as gzipped CSV."""
+        self.read(UGOracleReader(compress_archive=True))
+
+        with gzip.open(os.path.join(self.archive_dir, "users_to_sync_from_oracle_1.csv.gz"), "rt",
+                       newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(USER_COLUMNS, rows[0])
+        self.assertEqual([row[0] for row in USER_ROWS], [row[0] for row in rows[1:]])
+
+    def test_pool_is_reused(self):
+        """Reads with the same details share one pool, and each connection is given back."""
+        reader = UGOracleReader()
+        self.read(reader)
+        self.read(reader, self.groups_sql)
+
+        self.assertEqual(1, len(FakeSessionPool.created))
+        pool = FakeSessionPool.created[0]
+        self.assertEqual(2, pool.acquired)
+        self.assertEqual(2, pool.released)
+        self.assertEqual(("tsuser", "tsdb"), (pool.kwargs["user"], pool.kwargs["dsn"]))
+        self.assertNotIn("tspwd", [part for key in tsut.io._POOLS for part in key])
+
+    def test_missing_column(self):
+        """A mapped column that isn't in the query results is reported by name, and the connection given back."""
+        user_field_mapping = dict(UGOracleReader.DEFAULT_USER_FIELD_MAPPING, mail="Mail")
+        with self.assertRaisesRegex(ValueError, "No column called 'Mail' in query results"):
+            self.read(UGOracleReader(user_field_mapping=user_field_mapping))
+
+        group_field_mapping = dict(UGOracleReader.DEFAULT_GROUP_FIELD_MAPPING, description="Details")
+        with self.assertRaisesRegex(ValueError, "No column called 'Details' in query results"):
+            self.read(UGOracleReader(group_field_mapping=group_field_mapping), self.groups_sql)
+        self.assertEqual(2, FakeSessionPool.created[0].released)
+
+    def test_fetch_error(self):
+        """An error while fetching is raised, and the cursor is closed and the connection given back."""
+        reader = UGOracleReader()
+        self.read(reader)  # creates the pool.
+        pool = FakeSessionPool.created[0]
+        pool.fail_fetch = True
+
+        with self.assertRaisesRegex(RuntimeError, "lost the connection"):
+            self.read(reader)
+        self.assertEqual(2, pool.released)
+
+    def test_close_session_pools(self):
+        """The pools are closed at exit."""
+        self.read(UGOracleReader())
+        tsut.io._close_session_pools()
+
+        self.assertTrue(FakeSessionPool.created[0].closed)
+        self.assertEqual({}, tsut.io._POOLS)
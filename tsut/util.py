@@ -14,6 +14,54 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR TH
 import json
 import sys
 
+# orjson and ujson are both optional.  Use orjson if it's there, then ujson, and finally the standard library.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson as _fallback_json
+except ImportError:
+    _fallback_json = json
+
+
+def json_loads(data):
+    """
+    Parses JSON from a str or bytes using the fastest JSON library available.
+    :param data: The JSON to parse.
+    :type data: str | bytes
+    :return: The parsed JSON.
+    """
+    if orjson:
+        return orjson.loads(data)
+    return _fallback_json.loads(data)
+
+
+def json_dumps(obj):
+    """
+    Serializes an object to a JSON string using the fastest JSON library available.
+    :param obj: The object to serialize.
+    :return: A JSON string.
+    :rtype: str
+    """
+    if orjson:
+        return orjson.dumps(obj).decode("utf-8")
+    return _fallback_json.dumps(obj)
+
+
+def json_dumps_bytes(obj):
+    """
+    Serializes an object to UTF-8 encoded JSON using the fastest JSON library available.  Useful for request bodies and
+    multipart fields, which are sent as bytes anyway.
+    :param obj: The object to serialize.
+    :return: The JSON as bytes.
+    :rtype: bytes
+    """
+    if orjson:
+        return orjson.dumps(obj)
+    return _fallback_json.dumps(obj).encode("utf-8")
+
 
 def eprint(*args, **kwargs):
     """
@@ -28,7 +76,10 @@ def public_props(obj):
     """
     Returns any property that doesn't start with an _
     """
-    return (name for name in vars(obj).keys() if not name.startswith("_"))
+    names = getattr(type(obj), "__slots__", None)
+    if names is None:
+        names = vars(obj).keys()
+    return (name for name in names if not name.startswith("_"))
 
 
 def obj_to_json(obj):
@@ -53,7 +104,7 @@ def obj_to_json(obj):
             json_str += ","
 
         if value:
-            json_str += f'"{name}":{json.dumps(value)}'
+            json_str += f'"{name}":{json_dumps(value)}'
 
     json_str += "}"
 
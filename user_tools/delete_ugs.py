@@ -41,9 +41,11 @@ def run_app():
                                  password=args.password,
                                  disable_ssl=args.disable_ssl)
 
-        if args.users:
+        if args.users and args.groups:
+            delete_users_and_groups(args, sync)
+        elif args.users:
             delete_users(args, sync)
-        if args.groups:
+        elif args.groups:
             delete_groups(args, sync)
         if args.user_file:
             delete_users_from_file(args, sync)
@@ -101,6 +103,19 @@ def delete_users(args, sync):
     sync.delete_users(usernames=users)
 
 
+def delete_users_and_groups(args, sync):
+    """
+    Deletes the named users and groups.
+    :param args: The command line arguments.  Includes the lists of users and groups.
+    :type args: argparse.Namespace
+    :param sync: A sync to use for deleting users and groups.
+    :type sync: SyncUsersAndGroups
+    """
+    users = [x.strip() for x in args.users.split(",")]
+    groups = [x.strip() for x in args.groups.split(",")]
+    sync.delete_users_and_groups(usernames=users, groupnames=groups)
+
+
 def delete_users_from_file(args, sync):
     """
     Deletes users from a file with list of users, one per line.